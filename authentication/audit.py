@@ -0,0 +1,194 @@
+# audit.py
+"""
+Buffered audit logging for UserActivity.
+
+Activities are queued in-process and written by a background thread with
+``bulk_create``, either once ``BATCH_SIZE`` rows are waiting or every
+``FLUSH_INTERVAL`` seconds. When the queue is full, callers wait at most
+``ENQUEUE_TIMEOUT`` seconds before the activity is dropped and logged, so
+request handlers never block on the audit table. Whatever is still queued
+is written when the process exits.
+
+SIGTERM's default action would kill the process without running atexit, so
+the app config replaces it with a normal exit (see install_sigterm_handler).
+Servers that handle SIGTERM themselves, such as gunicorn, already exit
+normally and keep their handler.
+"""
+import atexit
+import logging
+import queue
+import signal
+import threading
+import time
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections
+from django.utils import timezone
+from .models import CustomUser, UserActivity
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': True,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 2.0,
+    'MAX_QUEUE_SIZE': 10000,
+    'ENQUEUE_TIMEOUT': 0.01,
+    'SHUTDOWN_TIMEOUT': 5.0,
+}
+
+_STOP = object()
+
+
+def get_setting(name):
+    return getattr(settings, 'AUDIT_LOG', {}).get(name, DEFAULTS[name])
+
+
+class AuditLogWriter:
+    """Background writer that drains queued activities in batches"""
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=get_setting('MAX_QUEUE_SIZE'))
+        self.lock = threading.Lock()
+        self.thread = None
+        self.dropped = 0
+
+    def record(self, activities):
+        if not get_setting('ASYNC'):
+            self.write(activities)
+            return
+
+        self.ensure_started()
+        timeout = get_setting('ENQUEUE_TIMEOUT')
+        for activity in activities:
+            try:
+                self.queue.put(activity, timeout=timeout)
+            except queue.Full:
+                self.dropped += 1
+                logger.warning(
+                    'Audit queue full, dropped %s for user %s (%d dropped so far)',
+                    activity.action, activity.user_id, self.dropped
+                )
+
+    def ensure_started(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='audit-log-writer', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        batch_size = get_setting('BATCH_SIZE')
+        interval = get_setting('FLUSH_INTERVAL')
+        stopped = False
+        while not stopped:
+            batch, stopped = self.drain(batch_size, interval)
+            if batch:
+                self.write(batch)
+                close_old_connections()
+
+    def drain(self, batch_size, interval):
+        """Collect up to batch_size activities, waiting at most interval seconds"""
+        batch = []
+        deadline = time.monotonic() + interval
+        while len(batch) < batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def write(self, batch):
+        try:
+            UserActivity.objects.bulk_create(batch, batch_size=get_setting('BATCH_SIZE'))
+        except IntegrityError:
+            self.write_salvaged(batch)
+        except Exception:
+            logger.exception('Failed to write %d audit activities', len(batch))
+
+    def write_salvaged(self, batch):
+        """Retry a batch that hit a constraint, so one bad row doesn't cost the rest"""
+        # Usually a user deleted between logging and the flush
+        existing = set(CustomUser.objects.filter(
+            pk__in={activity.user_id for activity in batch}
+        ).values_list('pk', flat=True))
+        rows = [activity for activity in batch if activity.user_id in existing]
+        if len(rows) < len(batch):
+            logger.warning('Dropped %d audit activities of deleted users', len(batch) - len(rows))
+
+        for activity in rows:
+            # bulk_create may have assigned primary keys before the insert was rolled back
+            activity.pk = None
+            try:
+                UserActivity.objects.bulk_create([activity])
+            except Exception:
+                logger.exception('Failed to write audit activity %s for user %s', activity.action, activity.user_id)
+
+    def flush(self):
+        """Synchronously write everything that is still queued"""
+        batch = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        if batch:
+            self.write(batch)
+
+    def shutdown(self):
+        """Stop the writer thread and flush the remaining activities"""
+        thread = self.thread
+        if thread is not None and thread.is_alive():
+            try:
+                self.queue.put(_STOP, timeout=get_setting('SHUTDOWN_TIMEOUT'))
+                thread.join(get_setting('SHUTDOWN_TIMEOUT'))
+            except queue.Full:
+                pass
+        self.flush()
+
+
+audit_writer = AuditLogWriter()
+atexit.register(audit_writer.shutdown)
+
+
+def exit_on_sigterm(signum, frame):
+    # Unwinds the main thread and runs atexit, which flushes the audit queue
+    raise SystemExit(128 + signum)
+
+
+def install_sigterm_handler():
+    """Exit normally on SIGTERM, unless something else already handles it"""
+    if threading.current_thread() is not threading.main_thread():
+        return False
+    if signal.getsignal(signal.SIGTERM) != signal.SIG_DFL:
+        return False
+    signal.signal(signal.SIGTERM, exit_on_sigterm)
+    return True
+
+
+def build_activity(user, action, description="", ip_address=None):
+    return UserActivity(
+        user_id=user.pk,
+        action=action,
+        description=description,
+        ip_address=ip_address,
+        timestamp=timezone.now()
+    )
+
+
+# Utility function to log user activities
+def log_user_activity(user, action, description="", ip_address=None):
+    audit_writer.record([build_activity(user, action, description, ip_address)])
+
+
+def log_user_activities(activities):
+    """Queue several prebuilt UserActivity rows at once"""
+    audit_writer.record(activities)
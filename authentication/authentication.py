@@ -0,0 +1,94 @@
+# authentication.py
+import copy
+import time
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from tawheedUmrahBack.caching import LRUCache
+
+DEFAULTS = {
+    'MAX_SIZE': 2048,
+    'TTL': 30,
+    'SHARED_CACHE': None,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'TOKEN_AUTH_CACHE', {}).get(name, DEFAULTS[name])
+
+
+local_cache = LRUCache(max_size=get_setting('MAX_SIZE'), ttl=get_setting('TTL'))
+
+
+def shared_cache():
+    alias = get_setting('SHARED_CACHE')
+    return caches[alias] if alias else None
+
+
+def cache_key(key):
+    return f'auth-token:{key}'
+
+
+def generation_key(user_id):
+    return f'auth-user:{user_id}:generation'
+
+
+def get_generation(shared, user_id):
+    return shared.get_or_set(generation_key(user_id), time.time_ns(), None)
+
+
+def invalidate_user(user_id):
+    """Stop every worker from serving cached tokens of this user"""
+    shared = shared_cache()
+    if shared is not None:
+        shared.set(generation_key(user_id), time.time_ns(), None)
+
+
+def invalidate_token(key, user_id):
+    """Drop a token from both cache tiers, and from other workers' local tiers"""
+    local_cache.delete(key)
+    shared = shared_cache()
+    if shared is not None:
+        shared.delete(cache_key(key))
+    invalidate_user(user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that caches the resolved (user, token) pair.
+
+    Lookups go to a bounded in-process LRU first and then to the shared cache
+    named by ``TOKEN_AUTH_CACHE['SHARED_CACHE']``. Every entry records the
+    user's generation counter from the shared cache, which is bumped when one
+    of their tokens is deleted or the user row is saved, so an entry is only
+    trusted while its generation is still current in every worker.
+
+    Without a shared cache a logout couldn't reach the other workers, so
+    nothing is cached and every request looks the token up.
+    """
+
+    def authenticate_credentials(self, key):
+        shared = shared_cache()
+        if shared is None:
+            return super().authenticate_credentials(key)
+
+        cached = self.current(local_cache.get(key), shared)
+        if cached is None:
+            cached = self.current(shared.get(cache_key(key)), shared)
+            if cached is None:
+                user, token = super().authenticate_credentials(key)
+                cached = (user, token, get_generation(shared, user.pk))
+                shared.set(cache_key(key), cached, get_setting('TTL'))
+            local_cache.set(key, cached)
+
+        # Hand each request its own copy so view code can't mutate the cached user
+        user, token, generation = cached
+        return copy.copy(user), token
+
+    @staticmethod
+    def current(cached, shared):
+        """cached, unless its user has been invalidated since it was stored"""
+        if cached is None:
+            return None
+        user, token, generation = cached
+        return cached if get_generation(shared, user.pk) == generation else None
@@ -0,0 +1,24 @@
+# backends.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticate by email address with one indexed lookup, for the login
+    endpoint. Everything else (admin login, permissions) is ModelBackend's.
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        user = UserModel._default_manager.filter(email=email).first()
+        if user is None:
+            # Hash anyway so response times don't reveal which emails exist
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
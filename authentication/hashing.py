@@ -0,0 +1,184 @@
+"""
+Bounded worker pool for password hashing.
+
+PBKDF2 is deliberately slow, so a burst of logins or registrations can tie
+up every request worker. PooledPBKDF2PasswordHasher, first in
+PASSWORD_HASHERS, runs the key derivation on a small thread pool instead
+(hashlib releases the GIL while hashing), so authenticate(), set_password()
+and make_password() all go through it.
+
+At most ``PASSWORD_HASHING['MAX_WORKERS'] + ['MAX_QUEUE']`` hashes are
+admitted at once, and anything beyond that fails fast with 503 rather than
+queueing. With ``PASSWORD_HASHING['SHARED_CACHE']`` set the limit is counted
+in that cache, across every process using it; without one it is counted per
+process, which only sheds load on a threaded server, since a process serving
+one request at a time never has more than one hash in flight.
+"""
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+DEFAULTS = {
+    'MAX_WORKERS': os.cpu_count() or 2,
+    'MAX_QUEUE': 16,
+    'SHARED_CACHE': None,
+}
+
+IN_FLIGHT_KEY = 'password-hashing:in-flight'
+# The shared counter is reset this often, so slots held by a killed process
+# are only lost until then
+IN_FLIGHT_TTL = 60
+
+# Set on threads (and processes) that hash inline rather than on the pool
+inline = threading.local()
+
+
+def get_setting(name):
+    return getattr(settings, 'PASSWORD_HASHING', {}).get(name, DEFAULTS[name])
+
+
+class HashingPoolSaturated(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The server is busy. Please try again shortly.'
+    default_code = 'hashing_saturated'
+    # Picked up by DRF's exception handler as the Retry-After header
+    wait = 1
+
+
+def hash_inline():
+    inline.active = True
+
+
+def shared_cache():
+    alias = get_setting('SHARED_CACHE')
+    return caches[alias] if alias else None
+
+
+class HashingPool:
+
+    def __init__(self, max_workers, max_queue):
+        self.max_workers = max_workers
+        self.limit = max_workers + max_queue
+        self.slots = threading.BoundedSemaphore(self.limit)
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def get_executor(self):
+        # Created lazily so forked server workers don't inherit a dead pool
+        if self.executor is None:
+            with self.lock:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(
+                        self.max_workers, thread_name_prefix='password-hash', initializer=hash_inline
+                    )
+        return self.executor
+
+    def admit(self):
+        """Take one slot, or raise HashingPoolSaturated; returns the cache counting it"""
+        shared = shared_cache()
+        if shared is None:
+            if not self.slots.acquire(blocking=False):
+                raise HashingPoolSaturated
+            return None
+        shared.add(IN_FLIGHT_KEY, 0, IN_FLIGHT_TTL)
+        try:
+            in_flight = shared.incr(IN_FLIGHT_KEY)
+        except ValueError:
+            # Expired between add() and incr()
+            shared.add(IN_FLIGHT_KEY, 1, IN_FLIGHT_TTL)
+            in_flight = 1
+        if in_flight > self.limit:
+            self.release(shared)
+            raise HashingPoolSaturated
+        return shared
+
+    def release(self, shared=None):
+        if shared is None:
+            self.slots.release()
+            return
+        try:
+            shared.decr(IN_FLIGHT_KEY)
+        except ValueError:
+            pass  # The counter expired and started again from zero
+
+    def submit(self, fn, *args):
+        shared = self.admit()
+        try:
+            future = self.get_executor().submit(fn, *args)
+        except BaseException:
+            self.release(shared)
+            raise
+        future.add_done_callback(lambda _: self.release(shared))
+        return future
+
+    def run(self, fn, *args):
+        """Run fn on the pool and wait for its result, or raise HashingPoolSaturated"""
+        return self.submit(fn, *args).result()
+
+    def map(self, fn, items):
+        """
+        Run fn over items, at most max_workers at a time, so a batch can't
+        take every queue slot from concurrent logins. The batch is admitted
+        once, up front: it raises HashingPoolSaturated before any work is
+        done or not at all.
+        """
+        shared = self.admit()
+        try:
+            results = []
+            pending = deque()
+            for item in items:
+                if len(pending) >= self.max_workers:
+                    results.append(pending.popleft().result())
+                pending.append(self.get_executor().submit(fn, item))
+            results.extend(future.result() for future in pending)
+            return results
+        finally:
+            self.release(shared)
+
+
+hashing_pool = HashingPool(get_setting('MAX_WORKERS'), get_setting('MAX_QUEUE'))
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """Django's PBKDF2 hasher, with the derivation run on the hashing pool"""
+
+    def encode(self, password, salt, iterations=None):
+        if getattr(inline, 'active', False):
+            return super().encode(password, salt, iterations)
+        return hashing_pool.run(super().encode, password, salt, iterations)
+
+
+def hash_passwords(passwords):
+    """Hash a request's batch of passwords on the shared pool"""
+    return hashing_pool.map(make_password, passwords)
+
+
+def setup_worker():
+    django.setup()
+    hash_inline()
+
+
+def hash_passwords_in_processes(passwords, processes):
+    """
+    Hash many passwords at once for offline batch jobs such as the
+    import_users command. Starting the pool costs a few seconds, so requests
+    use hash_passwords() instead.
+
+    This module doesn't import any models, so spawned workers can load it
+    before Django is set up.
+    """
+    if processes <= 1 or len(passwords) <= 1:
+        return [make_password(password) for password in passwords]
+    # spawn: forking a process that runs the audit writer and hashing threads isn't safe
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(processes, mp_context=context, initializer=setup_worker) as executor:
+        chunksize = max(1, len(passwords) // (processes * 4))
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
@@ -0,0 +1,178 @@
+"""
+Bulk user import from CSV or JSON.
+
+Rows are validated up front (including the creator's ``can_create_role``
+rules and one query for emails that already exist), passwords are hashed
+in parallel (on the shared hashing pool for requests, on a process pool for
+the management command), and users, their tokens and the creator's
+USER_CREATED activities are written with ``bulk_create`` in batches.
+Invalid rows are skipped and reported; valid ones are imported.
+"""
+import csv
+import io
+import json
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+from rest_framework.authtoken.models import Token
+from .hashing import hash_passwords, hash_passwords_in_processes
+from .models import CustomUser, UserActivity
+from .usernames import allocate_usernames, taken_suffixes, username_base
+
+DEFAULTS = {
+    'PROCESSES': os.cpu_count() or 2,
+    'BATCH_SIZE': 500,
+    'MAX_ROWS_PER_REQUEST': 500,
+}
+
+def get_setting(name):
+    return getattr(settings, 'USER_IMPORT', {}).get(name, DEFAULTS[name])
+
+
+class UserImportRowSerializer(serializers.Serializer):
+    first_name = serializers.CharField(max_length=150)
+    last_name = serializers.CharField(max_length=150)
+    email = serializers.EmailField()
+    phone = serializers.CharField(max_length=15, required=False, allow_blank=True, default='')
+    password = serializers.CharField(min_length=8)
+    role = serializers.ChoiceField(choices=CustomUser.USER_ROLES, default='user')
+
+    def validate_role(self, value):
+        creator = self.context['creator']
+        if not creator.can_create_role(value):
+            raise serializers.ValidationError(
+                f"You don't have permission to create users with role: {value}"
+            )
+        return value
+
+
+@dataclass
+class ImportResult:
+    created: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+
+def read_rows(stream, fmt):
+    """Parse an uploaded or opened file into a list of dicts; fmt is 'csv' or 'json'"""
+    content = stream.read()
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if fmt == 'csv':
+        return list(csv.DictReader(io.StringIO(content)))
+    if fmt == 'json':
+        data = json.loads(content)
+        rows = data.get('users') if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError('Expected a list of users or {"users": [...]}')
+        return rows
+    raise ValueError(f'Unsupported format: {fmt}')
+
+
+def validate_rows(rows, creator):
+    """Split rows into (valid data, errors); row numbers in errors start at 1"""
+    valid, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        serializer = UserImportRowSerializer(data=row, context={'creator': creator})
+        if serializer.is_valid():
+            data = dict(serializer.validated_data)
+            data['email'] = CustomUser.objects.normalize_email(data['email'])
+            valid.append((number, data))
+        else:
+            errors.append({'row': number, 'errors': serializer.errors})
+
+    seen = Counter(data['email'] for _, data in valid)
+    existing = set(CustomUser.objects.filter(email__in=list(seen)).values_list('email', flat=True))
+    unique, first_seen = [], set()
+    for number, data in valid:
+        if data['email'] in existing:
+            errors.append({'row': number, 'errors': {'email': ['A user with this email already exists.']}})
+        elif data['email'] in first_seen:
+            errors.append({'row': number, 'errors': {'email': ['Duplicate email in import.']}})
+        else:
+            first_seen.add(data['email'])
+            unique.append((number, data))
+    return unique, sorted(errors, key=lambda error: error['row'])
+
+
+def allocate_batch_usernames(emails):
+    """Usernames for a batch, scanning only bases that are taken or repeated"""
+    bases = [username_base(email) for email in emails]
+    repeated = {base for base, count in Counter(bases).items() if count > 1}
+    existing = set(CustomUser.objects.filter(username__in=set(bases)).values_list('username', flat=True))
+
+    taken = {}
+    usernames = []
+    for base in bases:
+        if base not in taken:
+            taken[base] = taken_suffixes(base) if base in existing or base in repeated else set()
+        usernames.append(allocate_usernames(base, taken=taken[base])[0])
+    return usernames
+
+
+def insert_batch(batch, creator, ip_address):
+    users = [
+        CustomUser(
+            username='', email=data['email'], password=data['password'],
+            first_name=data['first_name'], last_name=data['last_name'],
+            phone=data['phone'], role=data['role']
+        )
+        for data in batch
+    ]
+    for attempt in range(2):
+        for user, username in zip(users, allocate_batch_usernames([user.email for user in users])):
+            user.username = username
+        try:
+            with transaction.atomic():
+                users = CustomUser.objects.bulk_create(users)
+            break
+        except IntegrityError:
+            # A concurrent signup took one of the names; allocate again once
+            if attempt:
+                raise
+
+    if any(user.pk is None for user in users):
+        # Backends without RETURNING (MySQL) don't set primary keys on bulk_create
+        ids = dict(CustomUser.objects.filter(
+            username__in=[user.username for user in users]
+        ).values_list('username', 'pk'))
+        for user in users:
+            user.pk = ids[user.username]
+
+    Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in users])
+    UserActivity.objects.bulk_create([
+        UserActivity(
+            user=creator, action='USER_CREATED', ip_address=ip_address,
+            description=f'Created user: {user.username} with role: {user.role} (bulk import)'
+        )
+        for user in users
+    ])
+    return users
+
+
+def import_users(rows, creator, ip_address=None, processes=None, batch_size=None):
+    """
+    Validate, hash and insert rows on behalf of creator; returns an ImportResult.
+
+    Passwords go to the bounded hashing pool (which may raise
+    HashingPoolSaturated) unless processes is given.
+    """
+    batch_size = batch_size or get_setting('BATCH_SIZE')
+
+    valid, errors = validate_rows(rows, creator)
+    result = ImportResult(errors=errors)
+    passwords = [data['password'] for _, data in valid]
+    if processes is None:
+        hashed = hash_passwords(passwords)
+    else:
+        hashed = hash_passwords_in_processes(passwords, processes)
+    for (_, data), password in zip(valid, hashed):
+        data['password'] = password
+
+    with transaction.atomic():
+        for offset in range(0, len(valid), batch_size):
+            batch = [data for _, data in valid[offset:offset + batch_size]]
+            result.created.extend(insert_batch(batch, creator, ip_address))
+    return result
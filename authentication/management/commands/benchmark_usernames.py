@@ -0,0 +1,54 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from authentication.models import CustomUser
+from authentication.usernames import allocate_username
+
+
+def probe_username(base):
+    """The previous allocation strategy: one exists() query per candidate"""
+    username = base
+    counter = 1
+    while CustomUser.objects.filter(username=username).exists():
+        username = f'{base}{counter}'
+        counter += 1
+    return username
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a heavily colliding username prefix and compare the old probe loop '
+        'with the prefix-scan allocator. Seeded rows are always rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base', default='info')
+        parser.add_argument('--collisions', type=int, default=500)
+        parser.add_argument('--noise', type=int, default=5000, help='Unrelated usernames to seed')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        base = options['base']
+        with transaction.atomic():
+            self.stdout.write(f'Seeding {options["collisions"]} x "{base}" and {options["noise"]} other users...')
+            CustomUser.objects.bulk_create([
+                CustomUser(username=f'{base}{i}' if i else base, email=f'{base}@example.com', password='!')
+                for i in range(options['collisions'])
+            ] + [
+                CustomUser(username=f'user{i}', email=f'user{i}@example.com', password='!')
+                for i in range(options['noise'])
+            ], batch_size=1000)
+
+            for label, allocate in (('probe loop', probe_username), ('prefix scan', allocate_username)):
+                with CaptureQueriesContext(connection) as ctx:
+                    username = allocate(base)
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    allocate(base)
+                elapsed_ms = (time.perf_counter() - started) * 1000 / options['repeat']
+                self.stdout.write(
+                    f'{label}: {username} in {len(ctx.captured_queries)} queries, {elapsed_ms:.2f} ms'
+                )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,49 @@
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from authentication.importing import get_setting, import_users, read_rows
+from authentication.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Import users from a CSV or JSON file with columns first_name, last_name, '
+        'email, phone, password and role. Rows are checked against the role '
+        'hierarchy of --created-by.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--created-by', required=True, help='Username of the admin doing the import')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Defaults to the file extension')
+        parser.add_argument('--processes', type=int, help='Password hashing processes')
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        fmt = options['format'] or path.suffix.lstrip('.').lower()
+        try:
+            creator = CustomUser.objects.get(username=options['created_by'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f'No user named {options["created_by"]}')
+
+        try:
+            with path.open('rb') as stream:
+                rows = read_rows(stream, fmt)
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        started = time.perf_counter()
+        processes = options['processes']
+        result = import_users(
+            rows, creator, processes=get_setting('PROCESSES') if processes is None else processes,
+            batch_size=options['batch_size']
+        )
+        elapsed = time.perf_counter() - started
+
+        for error in result.errors:
+            self.stderr.write(f'Row {error["row"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {len(result.created)} of {len(rows)} users in {elapsed:.1f}s '
+            f'({len(result.errors)} rejected)'
+        ))
@@ -1,6 +1,9 @@
 # models.py
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
+from . import roles
+from .roles import capabilities_for, creatable_roles_for
 
 class CustomUser(AbstractUser):
     USER_ROLES = [
@@ -18,38 +21,41 @@ class CustomUser(AbstractUser):
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Login and registration look users up by email
+            models.Index(fields=['email'], name='user_email_idx'),
+        ]
     
-    # Role-based permissions
+    # Role-based permissions, looked up in the precomputed table in roles.py
+    @property
+    def capabilities(self):
+        return capabilities_for(self.role)
+
     @property
     def is_superadmin(self):
-        return self.role == 'superadmin'
+        return roles.IS_SUPERADMIN in self.capabilities
     
     @property
     def is_admin(self):
-        return self.role in ['superadmin', 'admin']
+        return roles.IS_ADMIN in self.capabilities
     
     @property
     def is_consulting(self):
-        return self.role in ['superadmin', 'admin', 'consulting']
+        return roles.IS_CONSULTING in self.capabilities
     
     @property
     def is_seouser(self):
-        return self.role in ['superadmin', 'admin', 'consulting', 'seouser']
+        return roles.IS_SEOUSER in self.capabilities
     
     def can_manage_users(self):
         """Check if user can manage other users"""
-        return self.role in ['superadmin', 'admin']
+        return roles.CAN_MANAGE_USERS in self.capabilities
     
     def can_create_role(self, target_role):
         """Check if user can create users with specific role"""
-        role_hierarchy = {
-            'superadmin': ['superadmin', 'admin', 'consulting', 'seouser', 'user'],
-            'admin': ['admin', 'consulting', 'seouser', 'user'],
-            'consulting': ['user'],
-            'seouser': [],
-            'user': []
-        }
-        return target_role in role_hierarchy.get(self.role, [])
+        return target_role in creatable_roles_for(self.role)
 
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
@@ -60,11 +66,17 @@ class UserActivity(models.Model):
     action = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     ip_address = models.GenericIPAddressField(blank=True, null=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the event happens, not when the buffered audit writer flushes it
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['-timestamp']
         verbose_name_plural = 'User Activities'
+        indexes = [
+            # Keyset pagination on (timestamp, id), globally and per user
+            models.Index(fields=['-timestamp', '-id'], name='activity_timestamp_id_idx'),
+            models.Index(fields=['user', '-timestamp', '-id'], name='activity_user_timestamp_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.action} at {self.timestamp}"
\ No newline at end of file
@@ -1,56 +1,43 @@
 # permissions.py
 from rest_framework import permissions
+from . import roles
+from .roles import user_has_capability
 
 class IsAdminOrSuperAdmin(permissions.BasePermission):
     """
     Custom permission to only allow admins and superadmins to access.
     """
     def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and 
-            (request.user.is_admin or request.user.is_superadmin)  # Check BOTH fields
-        )
+        return user_has_capability(request.user, roles.IS_ADMIN)
 
 class IsSuperAdmin(permissions.BasePermission):
     """
     Custom permission to only allow superadmins to access.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.is_superadmin
+        return user_has_capability(request.user, roles.IS_SUPERADMIN)
 
 class IsOwnerOrAdmin(permissions.BasePermission):
     """
     Custom permission to allow users to access their own data or admins to access any data.
     """
     def has_object_permission(self, request, view, obj):
-        # Read permissions for owner or admin
-        if request.method in permissions.SAFE_METHODS:
-            return (
-                obj == request.user or 
-                request.user.is_admin or 
-                request.user.is_superadmin
-            )
-        
-        # Write permissions for owner or admin
-        return (
-            obj == request.user or 
-            request.user.is_admin or 
-            request.user.is_superadmin
-        )
+        # Read and write permissions for owner or admin (superadmins have IS_ADMIN too)
+        return obj == request.user or user_has_capability(request.user, roles.IS_ADMIN)
 
 class IsConsultingOrAbove(permissions.BasePermission):
     """
     Custom permission for consulting level and above.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.is_consulting
+        return user_has_capability(request.user, roles.IS_CONSULTING)
 
 class IsSEOUserOrAbove(permissions.BasePermission):
     """
     Custom permission for SEO user level and above.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.is_seouser
+        return user_has_capability(request.user, roles.IS_SEOUSER)
 
 class CanManageRole(permissions.BasePermission):
     """
@@ -0,0 +1,79 @@
+"""
+Role capability table.
+
+Each role maps to a frozenset of capabilities and of roles it may create,
+built once at import. CustomUser's role properties and the permission
+classes both read from here, so a check is a single set membership test.
+"""
+import copy
+from functools import lru_cache
+
+SUPERADMIN = 'superadmin'
+ADMIN = 'admin'
+CONSULTING = 'consulting'
+SEOUSER = 'seouser'
+USER = 'user'
+
+ROLES = (SUPERADMIN, ADMIN, CONSULTING, SEOUSER, USER)
+
+# Capabilities, named after the CustomUser properties that expose them
+IS_SUPERADMIN = 'is_superadmin'
+IS_ADMIN = 'is_admin'
+IS_CONSULTING = 'is_consulting'
+IS_SEOUSER = 'is_seouser'
+CAN_MANAGE_USERS = 'can_manage_users'
+
+ROLE_CAPABILITIES = {
+    SUPERADMIN: frozenset({IS_SUPERADMIN, IS_ADMIN, IS_CONSULTING, IS_SEOUSER, CAN_MANAGE_USERS}),
+    ADMIN: frozenset({IS_ADMIN, IS_CONSULTING, IS_SEOUSER, CAN_MANAGE_USERS}),
+    CONSULTING: frozenset({IS_CONSULTING, IS_SEOUSER}),
+    SEOUSER: frozenset({IS_SEOUSER}),
+    USER: frozenset(),
+}
+
+CREATABLE_ROLES = {
+    SUPERADMIN: frozenset({SUPERADMIN, ADMIN, CONSULTING, SEOUSER, USER}),
+    ADMIN: frozenset({ADMIN, CONSULTING, SEOUSER, USER}),
+    CONSULTING: frozenset({USER}),
+    SEOUSER: frozenset(),
+    USER: frozenset(),
+}
+
+NO_CAPABILITIES = frozenset()
+
+
+def capabilities_for(role):
+    return ROLE_CAPABILITIES.get(role, NO_CAPABILITIES)
+
+
+def creatable_roles_for(role):
+    return CREATABLE_ROLES.get(role, NO_CAPABILITIES)
+
+
+def user_has_capability(user, capability):
+    """For permission classes: False for anonymous users"""
+    return user.is_authenticated and capability in capabilities_for(user.role)
+
+
+@lru_cache(maxsize=None)
+def build_role_permissions(role, role_display):
+    """The user_permissions payload, built once per role; shared, so never mutate it"""
+    capabilities = capabilities_for(role)
+    creatable = creatable_roles_for(role)
+    return {
+        'role': role,
+        'role_display': role_display,
+        'permissions': {
+            'can_manage_users': CAN_MANAGE_USERS in capabilities,
+            'is_superadmin': IS_SUPERADMIN in capabilities,
+            'is_admin': IS_ADMIN in capabilities,
+            'is_consulting': IS_CONSULTING in capabilities,
+            'is_seouser': IS_SEOUSER in capabilities,
+            'can_create_roles': {target: target in creatable for target in ROLES},
+        }
+    }
+
+
+def role_permissions(role, role_display):
+    """A copy of the role's user_permissions payload, safe for the caller to change"""
+    return copy.deepcopy(build_role_permissions(role, role_display))
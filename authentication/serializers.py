@@ -1,7 +1,11 @@
 # serializers.py
-from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
 from .models import CustomUser, UserActivity
+from .usernames import allocate_username, username_base
+
+USERNAME_ATTEMPTS = 3
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     first_name = serializers.CharField(max_length=150)
@@ -32,26 +36,26 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         first_name = validated_data.get('first_name', '')
         last_name = validated_data.get('last_name', '')
 
-        # Create username from email
-        username = validated_data['email'].split('@')[0]
-
-        # Ensure username is unique
-        original_username = username
-        counter = 1
-        while CustomUser.objects.filter(username=username).exists():
-            username = f"{original_username}{counter}"
-            counter += 1
-
-        user = CustomUser.objects.create_user(
-            username=username,
-            email=validated_data['email'],
-            password=validated_data['password'],
+        user = CustomUser(
+            email=CustomUser.objects.normalize_email(validated_data['email']),
             phone=validated_data.get('phone', ''),
             role=validated_data.get('role', 'user'),
             first_name=first_name,
             last_name=last_name
         )
-        return user
+        user.set_password(validated_data['password'])
+
+        # Username from the email local part; retry if a concurrent signup takes it first
+        base = username_base(validated_data['email'])
+        for attempt in range(USERNAME_ATTEMPTS):
+            user.username = allocate_username(base)
+            try:
+                with transaction.atomic():
+                    user.save()
+                return user
+            except IntegrityError:
+                if attempt == USERNAME_ATTEMPTS - 1:
+                    raise
 
 
 class UserLoginSerializer(serializers.Serializer):
@@ -63,12 +67,8 @@ class UserLoginSerializer(serializers.Serializer):
         password = attrs.get('password')
 
         if email and password:
-            try:
-                user_obj = CustomUser.objects.get(email=email)
-                user = authenticate(username=user_obj.username, password=password)
-            except CustomUser.DoesNotExist:
-                user = None
-                
+            # EmailBackend looks the user up once by email; the hash runs on the bounded pool
+            user = authenticate(self.context.get('request'), email=email, password=password)
             if not user:
                 raise serializers.ValidationError('Invalid credentials')
             if not user.is_active:
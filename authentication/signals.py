@@ -0,0 +1,19 @@
+# signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import invalidate_token, invalidate_user
+from .models import CustomUser
+
+
+@receiver(post_delete, sender=Token)
+def drop_deleted_token(sender, instance, **kwargs):
+    """Logout deletes the token; stop authenticating it immediately"""
+    invalidate_token(instance.key, instance.user_id)
+
+
+@receiver(post_save, sender=CustomUser)
+def drop_cached_user(sender, instance, created, **kwargs):
+    """Status, password and role changes must not be served from the token cache"""
+    if not created:
+        invalidate_user(instance.pk)
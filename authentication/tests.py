@@ -1,3 +1,524 @@
-from django.test import TestCase
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from tawheedUmrahBack.throttling import get_buckets
+from .audit import AuditLogWriter, build_activity, install_sigterm_handler
+from tawheedUmrahBack.caching import LRUCache
+from .authentication import local_cache
+from .hashing import HashingPool, HashingPoolSaturated, hashing_pool
+from .models import CustomUser, UserActivity
+from .roles import build_role_permissions, role_permissions
+from .usernames import allocate_username, allocate_usernames
 
-# Create your tests here.
+
+@override_settings(TOKEN_AUTH_CACHE={**settings.TOKEN_AUTH_CACHE, 'SHARED_CACHE': 'default'})
+class CachedTokenAuthenticationTest(TestCase):
+
+    def setUp(self):
+        local_cache.clear()
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='pilgrim', email='pilgrim@example.com', password='password123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_permissions(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('user-permissions'))
+        return response, len(ctx.captured_queries)
+
+    def test_repeat_requests_skip_token_lookup(self):
+        response, first_queries = self.get_permissions()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(first_queries, 1)
+
+        response, cached_queries = self.get_permissions()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cached_queries, 0)
+
+    def test_deleted_token_is_rejected(self):
+        self.get_permissions()
+        self.token.delete()
+
+        response, _ = self.get_permissions()
+        self.assertEqual(response.status_code, 403)
+
+    def test_deactivated_user_is_rejected(self):
+        self.get_permissions()
+        self.user.is_active = False
+        self.user.save()
+
+        response, _ = self.get_permissions()
+        self.assertEqual(response.status_code, 403)
+
+    def test_role_change_is_visible(self):
+        self.get_permissions()
+        self.user.role = 'admin'
+        self.user.save()
+
+        response, _ = self.get_permissions()
+        self.assertEqual(response.data['role'], 'admin')
+
+    def test_invalidation_reaches_other_workers(self):
+        # Two workers: separate local tiers over the same shared cache
+        this_worker, other_worker = LRUCache(), LRUCache()
+        with mock.patch('authentication.authentication.local_cache', this_worker):
+            self.assertEqual(self.get_permissions()[0].status_code, 200)
+
+        with mock.patch('authentication.authentication.local_cache', other_worker):
+            self.user.is_active = False
+            self.user.save()
+        self.assertIsNotNone(this_worker.get(self.token.key))
+        with mock.patch('authentication.authentication.local_cache', this_worker):
+            self.assertEqual(self.get_permissions()[0].status_code, 403)
+
+    def test_logout_reaches_other_workers(self):
+        this_worker, other_worker = LRUCache(), LRUCache()
+        with mock.patch('authentication.authentication.local_cache', this_worker):
+            self.assertEqual(self.get_permissions()[0].status_code, 200)
+
+        with mock.patch('authentication.authentication.local_cache', other_worker):
+            self.token.delete()
+        with mock.patch('authentication.authentication.local_cache', this_worker):
+            self.assertEqual(self.get_permissions()[0].status_code, 403)
+
+    @override_settings(TOKEN_AUTH_CACHE={**settings.TOKEN_AUTH_CACHE, 'SHARED_CACHE': None})
+    def test_nothing_is_cached_without_a_shared_cache(self):
+        self.get_permissions()
+        response, queries = self.get_permissions()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 1)
+        self.assertIsNone(local_cache.get(self.token.key))
+
+
+@override_settings(AUDIT_LOG={'ASYNC': False}, REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'register': '2/min', 'contact': '2/min'},
+})
+class AnonymousThrottleTest(TestCase):
+
+    def setUp(self):
+        get_buckets().clear()
+        self.client = APIClient()
+
+    def register(self, number, ip='10.0.0.1', **extra):
+        return self.client.post(reverse('user-register'), {
+            'first_name': 'New', 'last_name': 'Pilgrim', 'email': f'new{number}@example.com',
+            'password': 'password123'
+        }, format='json', REMOTE_ADDR=ip, **extra)
+
+    def test_burst_beyond_bucket_is_rejected_without_writes(self):
+        self.assertEqual(self.register(1).status_code, 201)
+        self.assertEqual(self.register(2).status_code, 201)
+
+        with self.assertNumQueries(0):
+            response = self.register(3)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_buckets_are_per_ip_and_per_endpoint(self):
+        self.register(1)
+        self.register(2)
+
+        self.assertEqual(self.register(3, ip='10.0.0.2').status_code, 201)
+        contact = self.client.post(reverse('contact-us'), {
+            'name': 'Visitor', 'email': 'visitor@example.com', 'phone': '9999999999', 'message': 'Hi'
+        }, format='json', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(contact.status_code, 201)
+
+    def test_spoofed_forwarded_for_does_not_get_a_fresh_bucket(self):
+        for number in range(1, 3):
+            self.register(number, HTTP_X_FORWARDED_FOR=f'203.0.113.{number}')
+
+        response = self.register(3, HTTP_X_FORWARDED_FOR='203.0.113.3')
+        self.assertEqual(response.status_code, 429)
+
+    def test_behind_a_proxy_the_address_it_appends_is_used(self):
+        with override_settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {'register': '2/min'},
+            'NUM_PROXIES': 1,
+        }):
+            for number in range(1, 3):
+                self.register(number, HTTP_X_FORWARDED_FOR=f'203.0.113.{number}, 198.51.100.7')
+            spoofed = self.register(3, HTTP_X_FORWARDED_FOR='203.0.113.3, 198.51.100.7')
+            other_client = self.register(4, HTTP_X_FORWARDED_FOR='198.51.100.8')
+
+        self.assertEqual(spoofed.status_code, 429)
+        self.assertEqual(other_client.status_code, 201)
+
+
+@override_settings(AUDIT_LOG={'ASYNC': False})
+class PasswordHashingTest(TestCase):
+
+    def setUp(self):
+        get_buckets().clear()
+        self.user = CustomUser.objects.create_user(
+            username='pilgrim', email='pilgrim@example.com', password='password123'
+        )
+        self.client = APIClient()
+
+    def login(self, password='password123'):
+        return self.client.post(reverse('user-login'), {
+            'email': 'pilgrim@example.com', 'password': password
+        }, format='json')
+
+    def test_login_looks_user_up_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.login()
+        self.assertEqual(response.status_code, 200)
+
+        user_selects = [
+            query for query in ctx.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "authentication_customuser"' in query['sql']
+        ]
+        self.assertEqual(len(user_selects), 1)
+        self.assertEqual(self.login('wrong-password').status_code, 400)
+
+    def test_registered_password_is_usable(self):
+        response = self.client.post(reverse('user-register'), {
+            'first_name': 'New', 'last_name': 'Pilgrim', 'email': 'new@example.com',
+            'password': 'password123'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(CustomUser.objects.get(email='new@example.com').check_password('password123'))
+
+    def test_saturated_pool_fails_fast(self):
+        pool = HashingPool(max_workers=1, max_queue=0)
+        started, release = threading.Event(), threading.Event()
+        worker = threading.Thread(target=pool.run, args=(lambda: (started.set(), release.wait()),))
+        worker.start()
+        started.wait()
+        try:
+            with self.assertRaises(HashingPoolSaturated):
+                pool.run(lambda: None)
+        finally:
+            release.set()
+            worker.join()
+        self.assertIsNone(pool.run(lambda: None))
+
+    @override_settings(PASSWORD_HASHING={**settings.PASSWORD_HASHING, 'SHARED_CACHE': 'default'})
+    def test_shared_limit_spans_processes(self):
+        cache.clear()
+        # Two processes' pools, one slot between them
+        this_process = HashingPool(max_workers=1, max_queue=0)
+        other_process = HashingPool(max_workers=1, max_queue=0)
+        started, release = threading.Event(), threading.Event()
+        worker = threading.Thread(target=other_process.run, args=(lambda: (started.set(), release.wait()),))
+        worker.start()
+        started.wait()
+        try:
+            with self.assertRaises(HashingPoolSaturated):
+                this_process.run(lambda: None)
+            with self.assertRaises(HashingPoolSaturated):
+                this_process.map(lambda n: n, range(3))
+        finally:
+            release.set()
+            worker.join()
+        self.assertIsNone(this_process.run(lambda: None))
+
+    def test_map_keeps_batches_within_the_worker_count(self):
+        pool = HashingPool(max_workers=2, max_queue=0)
+        self.assertEqual(pool.map(lambda n: n * 2, range(5)), [0, 2, 4, 6, 8])
+
+    def test_map_is_admitted_once_for_the_whole_batch(self):
+        pool = HashingPool(max_workers=1, max_queue=0)
+        # The only slot is the batch's own, so any later admission would fail
+        self.assertEqual(pool.map(lambda n: n, range(5)), [0, 1, 2, 3, 4])
+        with mock.patch.object(pool, 'admit', wraps=pool.admit) as admit:
+            pool.map(lambda n: n, range(5))
+        admit.assert_called_once()
+
+    def test_failed_login_goes_through_auth_backends(self):
+        handler = mock.Mock()
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+
+        self.assertEqual(self.login('wrong-password').status_code, 400)
+        handler.assert_called_once()
+
+    def test_inactive_account_gets_the_generic_error(self):
+        self.user.is_active = False
+        self.user.save()
+        response = self.login()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['non_field_errors'], ['Invalid credentials'])
+
+    def test_login_returns_503_when_saturated(self):
+        with mock.patch.object(hashing_pool, 'run', side_effect=HashingPoolSaturated):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+@override_settings(AUDIT_LOG={'ASYNC': False})
+class UsernameAllocationTest(TestCase):
+
+    def setUp(self):
+        get_buckets().clear()
+        for username in ['info', 'info1', 'info3', 'infodesk', 'information2']:
+            CustomUser.objects.create(username=username, email=f'{username}@example.com')
+
+    def register(self, email='info@example.org'):
+        return APIClient().post(reverse('user-register'), {
+            'first_name': 'New', 'last_name': 'Pilgrim', 'email': email, 'password': 'password123'
+        }, format='json')
+
+    def test_lowest_free_suffix_is_allocated(self):
+        self.assertEqual(allocate_usernames('info', count=3), ['info2', 'info4', 'info5'])
+        self.assertEqual(allocate_username('fresh'), 'fresh')
+
+    def test_registration_reads_taken_usernames_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.register()
+        self.assertEqual(response.data['user']['email'], 'info@example.org')
+        self.assertEqual(CustomUser.objects.get(email='info@example.org').username, 'info2')
+
+        username_scans = [query for query in ctx.captured_queries if '"username" LIKE' in query['sql']]
+        self.assertEqual(len(username_scans), 1)
+
+    def test_registration_retries_when_username_is_taken_concurrently(self):
+        with mock.patch('authentication.serializers.allocate_username', side_effect=['info', 'info2']):
+            response = self.register()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(CustomUser.objects.get(email='info@example.org').username, 'info2')
+
+
+@override_settings(USER_IMPORT={'PROCESSES': 1, 'BATCH_SIZE': 2, 'MAX_ROWS_PER_REQUEST': 10})
+class ImportUsersTest(TestCase):
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='password123', role='admin'
+        )
+        CustomUser.objects.create(username='info', email='taken@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def row(self, email, **extra):
+        return {'first_name': 'Agency', 'last_name': 'Pilgrim', 'email': email, 'password': 'password123', **extra}
+
+    def test_valid_rows_are_bulk_created_with_tokens(self):
+        rows = [
+            self.row('info@agency.com'), self.row('info@other.com', role='consulting'),
+            self.row('hajj@agency.com'), self.row('taken@example.com'),
+            self.row('boss@agency.com', role='superadmin'), self.row('not-an-email'),
+        ]
+        response = self.client.post(reverse('user-import'), {'users': rows}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual([error['row'] for error in response.data['errors']], [4, 5, 6])
+        self.assertEqual(
+            sorted(user['username'] for user in response.data['users']), ['hajj', 'info1', 'info2']
+        )
+        imported = CustomUser.objects.filter(email__endswith='.com').exclude(pk=self.admin.pk)
+        self.assertEqual(Token.objects.filter(user__in=imported).count(), 3)
+        self.assertTrue(CustomUser.objects.get(email='hajj@agency.com').check_password('password123'))
+        self.assertEqual(UserActivity.objects.filter(user=self.admin, action='USER_CREATED').count(), 3)
+
+    def test_csv_upload_and_row_limit(self):
+        upload = SimpleUploadedFile(
+            'users.csv', b'first_name,last_name,email,password\nA,B,a@agency.com,password123\n'
+        )
+        response = self.client.post(reverse('user-import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.data['created'], 1)
+
+        rows = [self.row(f'user{i}@agency.com') for i in range(11)]
+        response = self.client.post(reverse('user-import'), rows, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_checks_creator_role(self):
+        consultant = CustomUser.objects.create_user(
+            username='consultant', email='c@example.com', password='password123', role='consulting'
+        )
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as handle:
+            json.dump([self.row('pilgrim@agency.com'), self.row('staff@agency.com', role='admin')], handle)
+        self.addCleanup(os.remove, handle.name)
+
+        call_command('import_users', handle.name, created_by=consultant.username, stdout=StringIO(), stderr=StringIO())
+        self.assertTrue(CustomUser.objects.filter(email='pilgrim@agency.com').exists())
+        self.assertFalse(CustomUser.objects.filter(email='staff@agency.com').exists())
+
+    @override_settings(USER_IMPORT={'PROCESSES': 2, 'BATCH_SIZE': 2})
+    def test_command_hashes_on_a_process_pool(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as handle:
+            json.dump([self.row(f'pilgrim{i}@agency.com') for i in range(3)], handle)
+        self.addCleanup(os.remove, handle.name)
+
+        call_command('import_users', handle.name, created_by=self.admin.username, stdout=StringIO())
+        imported = CustomUser.objects.filter(email__startswith='pilgrim')
+        self.assertEqual(imported.count(), 3)
+        self.assertTrue(all(user.check_password('password123') for user in imported))
+
+    def test_endpoint_hashes_on_the_shared_pool(self):
+        rows = [self.row('a@agency.com'), self.row('b@agency.com')]
+        with mock.patch('authentication.importing.hash_passwords_in_processes') as processes:
+            response = self.client.post(reverse('user-import'), rows, format='json')
+        self.assertEqual(response.data['created'], 2)
+        processes.assert_not_called()
+
+        with mock.patch.object(hashing_pool, 'admit', side_effect=HashingPoolSaturated):
+            response = self.client.post(reverse('user-import'), [self.row('c@agency.com')], format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(CustomUser.objects.filter(email='c@agency.com').exists())
+
+
+class RoleCapabilityTest(TestCase):
+
+    def test_capabilities_follow_role_hierarchy(self):
+        consultant = CustomUser(username='consultant', role='consulting')
+        self.assertTrue(consultant.is_consulting and consultant.is_seouser)
+        self.assertFalse(consultant.is_admin or consultant.can_manage_users())
+        self.assertTrue(consultant.can_create_role('user'))
+        self.assertFalse(consultant.can_create_role('seouser'))
+        self.assertFalse(CustomUser(role='unknown').is_seouser)
+
+    def test_permissions_payload_is_built_once_per_role(self):
+        admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='password123', role='admin'
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        build_role_permissions.cache_clear()
+
+        first = client.get(reverse('user-permissions')).data
+        second = client.get(reverse('user-permissions')).data
+
+        self.assertEqual(first, second)
+        self.assertEqual(build_role_permissions.cache_info().misses, 1)
+        self.assertTrue(first['permissions']['is_admin'])
+        self.assertFalse(first['permissions']['is_superadmin'])
+        self.assertEqual(
+            first['permissions']['can_create_roles'],
+            {'superadmin': False, 'admin': True, 'consulting': True, 'seouser': True, 'user': True}
+        )
+
+    def test_permissions_payload_cannot_be_changed_through_the_cache(self):
+        payload = role_permissions('user', 'User')
+        payload['permissions']['is_admin'] = True
+        payload['permissions']['can_create_roles']['admin'] = True
+
+        fresh = role_permissions('user', 'User')
+        self.assertFalse(fresh['permissions']['is_admin'])
+        self.assertFalse(fresh['permissions']['can_create_roles']['admin'])
+
+
+class AuditLogWriterTest(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser(pk=1, username='pilgrim')
+        self.batches = []
+        self.written = threading.Event()
+
+    def writer(self, **options):
+        settings_override = override_settings(AUDIT_LOG={'ASYNC': True, **options})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        writer = AuditLogWriter()
+        self.addCleanup(writer.shutdown)
+
+        def write(batch):
+            self.batches.append([activity.action for activity in batch])
+            self.written.set()
+        writer.write = write
+        return writer
+
+    def activities(self, *actions):
+        return [build_activity(self.user, action) for action in actions]
+
+    def test_full_batch_is_written_without_waiting_for_the_interval(self):
+        writer = self.writer(BATCH_SIZE=2, FLUSH_INTERVAL=60)
+        writer.record(self.activities('LOGIN', 'LOGOUT', 'LOGIN'))
+
+        self.assertTrue(self.written.wait(5))
+        self.assertEqual(self.batches[0], ['LOGIN', 'LOGOUT'])
+
+    def test_partial_batch_is_written_after_the_interval(self):
+        writer = self.writer(BATCH_SIZE=100, FLUSH_INTERVAL=0.05)
+        started = time.monotonic()
+        writer.record(self.activities('LOGIN'))
+
+        self.assertTrue(self.written.wait(5))
+        self.assertEqual(self.batches, [['LOGIN']])
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_activities_are_dropped_when_the_queue_is_full(self):
+        writer = self.writer(MAX_QUEUE_SIZE=1, ENQUEUE_TIMEOUT=0)
+        with mock.patch.object(writer, 'ensure_started'):
+            writer.record(self.activities('LOGIN', 'LOGOUT', 'LOGIN'))
+
+        self.assertEqual(writer.dropped, 2)
+        self.assertEqual(writer.queue.qsize(), 1)
+
+    def test_shutdown_drains_the_queue(self):
+        writer = self.writer(BATCH_SIZE=100, FLUSH_INTERVAL=60)
+        writer.record(self.activities('LOGIN', 'LOGOUT'))
+        writer.shutdown()
+
+        self.assertFalse(writer.thread.is_alive())
+        self.assertEqual(sum(self.batches, []), ['LOGIN', 'LOGOUT'])
+
+    def test_sigterm_flushes_the_queue(self):
+        script = (
+            'import os, signal, sys, time, django\n'
+            'django.setup()\n'
+            'from authentication.audit import audit_writer, build_activity\n'
+            'from authentication.models import CustomUser\n'
+            'def write(batch):\n'
+            '    with open(sys.argv[1], "a") as out:\n'
+            '        out.write(" ".join(activity.action for activity in batch))\n'
+            'audit_writer.write = write\n'
+            'audit_writer.record([build_activity(CustomUser(pk=1), "LOGIN")])\n'
+            'os.kill(os.getpid(), signal.SIGTERM)\n'
+            'time.sleep(30)\n'
+        )
+        with tempfile.NamedTemporaryFile('r', suffix='.log') as written:
+            process = subprocess.run(
+                [sys.executable, '-c', script, written.name], cwd=settings.BASE_DIR, timeout=60,
+                env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'tawheedUmrahBack.settings'},
+            )
+            self.assertEqual(process.returncode, 128 + signal.SIGTERM)
+            self.assertEqual(written.read(), 'LOGIN')
+
+    def test_existing_sigterm_handler_is_kept(self):
+        with mock.patch('signal.getsignal', return_value=lambda signum, frame: None), \
+                mock.patch('signal.signal') as install:
+            self.assertFalse(install_sigterm_handler())
+        install.assert_not_called()
+
+
+class AuditLogSalvageTest(TransactionTestCase):
+    """Needs real commits: SQLite only checks foreign keys when the transaction ends"""
+
+    def test_rows_of_deleted_users_do_not_cost_the_batch(self):
+        kept = CustomUser.objects.create_user(username='kept', email='kept@example.com', password='password123')
+        deleted = CustomUser.objects.create_user(username='gone', email='gone@example.com', password='password123')
+        batch = [build_activity(kept, 'LOGIN'), build_activity(deleted, 'LOGIN'), build_activity(kept, 'LOGOUT')]
+        deleted.delete()
+
+        AuditLogWriter().write(batch)
+
+        self.assertEqual(
+            sorted(UserActivity.objects.values_list('action', flat=True)), ['LOGIN', 'LOGOUT']
+        )
@@ -7,6 +7,7 @@ from .views import (
     UserListView,
     UserDetailView,
     CreateUserView,
+    ImportUsersView,
     ChangePasswordView,
     UserActivityView,
     LogoutView,
@@ -31,6 +32,7 @@ urlpatterns = [
     # Admin user management
     path('users/', UserListView.as_view(), name='user-list'),
     path('users/create/', CreateUserView.as_view(), name='user-create'),
+    path('users/import/', ImportUsersView.as_view(), name='user-import'),
     path('users/<int:pk>/', UserDetailView.as_view(), name='user-detail'),
     path('users/<int:user_id>/toggle-status/', toggle_user_status, name='toggle-user-status'),
     
@@ -0,0 +1,52 @@
+"""
+Username allocation for new accounts.
+
+Usernames are derived from the email local part and suffixed with the
+lowest free number on collision (``info``, ``info1``, ``info2`` ...). The
+taken names are read with a single prefix scan over the unique username
+index rather than probing one candidate per query.
+"""
+import re
+from .models import CustomUser
+
+MAX_LENGTH = CustomUser._meta.get_field('username').max_length
+# Leave room for a numeric suffix on very long local parts
+MAX_BASE_LENGTH = MAX_LENGTH - 10
+
+
+def username_base(email):
+    return email.split('@')[0][:MAX_BASE_LENGTH]
+
+
+def taken_suffixes(base):
+    """Numeric suffixes already used after base; '' (the bare base) counts as 0"""
+    pattern = re.compile(rf'{re.escape(base)}(\d*)')
+    suffixes = set()
+    for username in CustomUser.objects.filter(username__startswith=base).values_list('username', flat=True):
+        match = pattern.fullmatch(username)
+        if match:
+            suffixes.add(int(match.group(1) or 0))
+    return suffixes
+
+
+def allocate_usernames(base, count=1, taken=None):
+    """
+    Return ``count`` free usernames for base, lowest suffixes first.
+
+    ``taken`` may be passed to reuse suffixes already fetched; it is updated
+    in place so repeated calls for the same base don't hand out duplicates.
+    """
+    if taken is None:
+        taken = taken_suffixes(base)
+    usernames = []
+    suffix = 0
+    while len(usernames) < count:
+        if suffix not in taken:
+            taken.add(suffix)
+            usernames.append(f'{base}{suffix}' if suffix else base)
+        suffix += 1
+    return usernames
+
+
+def allocate_username(base):
+    return allocate_usernames(base)[0]
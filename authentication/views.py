@@ -1,15 +1,21 @@
 # views.py
-from rest_framework import status, generics, permissions
+from rest_framework import status, generics
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.authentication import TokenAuthentication
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.contrib.auth import login, logout
 from django.shortcuts import get_object_or_404
+from tawheedUmrahBack.pagination import KeysetPagination
 from .models import CustomUser, UserActivity
+from .audit import log_user_activity
+from .authentication import CachedTokenAuthentication
+from .importing import get_setting as get_import_setting, import_users, read_rows
+from .permissions import IsAdminOrSuperAdmin
+from .roles import role_permissions
 from .serializers import (
     UserRegistrationSerializer, 
     UserLoginSerializer, 
@@ -20,32 +26,11 @@ from .serializers import (
     ChangePasswordSerializer
 )
 
-# Custom permission classes
-class IsAdminOrSuperAdmin(permissions.BasePermission):
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.is_admin
-
-class IsSuperAdmin(permissions.BasePermission):
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.is_superadmin
-
-class IsOwnerOrAdmin(permissions.BasePermission):
-    def has_object_permission(self, request, view, obj):
-        return obj == request.user or request.user.is_admin
-
-# Utility function to log user activities
-def log_user_activity(user, action, description="", ip_address=None):
-    UserActivity.objects.create(
-        user=user,
-        action=action,
-        description=description,
-        ip_address=ip_address
-    )
-
 @method_decorator(csrf_exempt, name='dispatch')
 class RegisterView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserRegistrationSerializer
+    throttle_scope = 'register'
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
@@ -85,7 +70,7 @@ class LoginView(generics.GenericAPIView):
         })
 
 class LogoutView(generics.GenericAPIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
@@ -214,6 +199,44 @@ class CreateUserView(generics.CreateAPIView):
             'message': 'User created successfully'
         }, status=status.HTTP_201_CREATED)
 
+class ImportUsersView(generics.GenericAPIView):
+    """
+    Bulk-create users - Admin only.
+
+    Accepts a CSV or JSON ``file`` upload, or a JSON body that is a list of
+    users or ``{"users": [...]}``. Larger imports belong to the
+    ``import_users`` management command.
+    """
+    permission_classes = [IsAdminOrSuperAdmin]
+    parser_classes = [JSONParser, MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                fmt = 'json' if upload.name.lower().endswith('.json') else 'csv'
+                rows = read_rows(upload, fmt)
+            else:
+                rows = request.data.get('users') if isinstance(request.data, dict) else request.data
+                if not isinstance(rows, list):
+                    raise ValueError('Expected a list of users or {"users": [...]}')
+        except (ValueError, UnicodeDecodeError) as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_rows = get_import_setting('MAX_ROWS_PER_REQUEST')
+        if len(rows) > max_rows:
+            return Response({
+                'error': f'At most {max_rows} users can be imported per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        result = import_users(rows, request.user, request.META.get('REMOTE_ADDR'))
+        return Response({
+            'created': len(result.created),
+            'users': UserListSerializer(result.created, many=True).data,
+            'errors': result.errors,
+            'message': f'{len(result.created)} users imported'
+        }, status=status.HTTP_201_CREATED if result.created else status.HTTP_400_BAD_REQUEST)
+
 @method_decorator(csrf_exempt, name='dispatch')
 class ChangePasswordView(generics.UpdateAPIView):
     """Change user password"""
@@ -244,6 +267,8 @@ class UserActivityView(generics.ListAPIView):
     """View user activities - Admin only"""
     serializer_class = UserActivitySerializer
     permission_classes = [IsAdminOrSuperAdmin]
+    pagination_class = KeysetPagination
+    cursor_ordering_field = 'timestamp'
     
     def get_queryset(self):
         user_id = self.kwargs.get('user_id')
@@ -322,25 +347,7 @@ def toggle_user_status(request, user_id):
 def user_permissions(request):
     """Get current user's permissions"""
     user = request.user
-    permissions_data = {
-        'role': user.role,
-        'role_display': user.get_role_display(),
-        'permissions': {
-            'can_manage_users': user.can_manage_users(),
-            'is_superadmin': user.is_superadmin,
-            'is_admin': user.is_admin,
-            'is_consulting': user.is_consulting,
-            'is_seouser': user.is_seouser,
-            'can_create_roles': {
-                'superadmin': user.can_create_role('superadmin'),
-                'admin': user.can_create_role('admin'),
-                'consulting': user.can_create_role('consulting'),
-                'seouser': user.can_create_role('seouser'),
-                'user': user.can_create_role('user'),
-            }
-        }
-    }
-    return Response(permissions_data)
+    return Response(role_permissions(user.role, user.get_role_display()))
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def verify_token(request):
@@ -1,8 +1,40 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.db import transaction
+from packages.inventory import CapacityExceeded, seats_available
 from .models import Booking
 
+
+class BookingAdminForm(forms.ModelForm):
+
+    class Meta:
+        model = Booking
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        booking = self.instance
+        # List edits only carry status; everything else comes from the row
+        package = cleaned_data.get('package', booking.package)
+        departure_date = cleaned_data.get('departure_date', booking.departure_date)
+        passengers = cleaned_data.get('passengers', booking.passengers)
+        status = cleaned_data.get('status', booking.status)
+        if package is None or status == 'cancelled' or not passengers:
+            return cleaned_data
+
+        seats = passengers
+        if booking.pk:
+            current = Booking.objects.get(pk=booking.pk)
+            if current.holds_seats and (current.package_id, current.departure_date) == (package.pk, departure_date):
+                seats -= current.passengers
+        if seats > 0 and not seats_available(package, departure_date, seats, exclude=booking.pk):
+            raise forms.ValidationError('Not enough seats left on this package')
+        return cleaned_data
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
+    form = BookingAdminForm
     list_display = (
         'booking_id', 'name', 'package_type', 'travel_month', 
         'nights', 'passengers', 'status', 'total_amount', 'created_at'
@@ -51,17 +83,36 @@ class BookingAdmin(admin.ModelAdmin):
     
     actions = ['mark_as_confirmed', 'mark_as_cancelled', 'mark_as_completed']
     
+    def save_model(self, request, obj, form, change):
+        # Move the booking's seats along with any change to what it holds
+        with transaction.atomic():
+            if change:
+                Booking.objects.select_for_update().get(pk=obj.pk).release_seats()
+            obj.reserve_seats()
+            obj.save()
+
+    def set_status(self, request, queryset, status):
+        updated = full = 0
+        for booking in queryset.exclude(status=status):
+            try:
+                booking.set_status(status)
+                updated += 1
+            except CapacityExceeded:
+                full += 1
+        self.message_user(request, f'{updated} bookings marked as {status}.')
+        if full:
+            self.message_user(
+                request, f'{full} bookings were not changed: not enough seats left.', messages.WARNING
+            )
+
     def mark_as_confirmed(self, request, queryset):
-        updated = queryset.update(status='confirmed')
-        self.message_user(request, f'{updated} bookings marked as confirmed.')
+        self.set_status(request, queryset, 'confirmed')
     mark_as_confirmed.short_description = "Mark selected bookings as confirmed"
     
     def mark_as_cancelled(self, request, queryset):
-        updated = queryset.update(status='cancelled')
-        self.message_user(request, f'{updated} bookings marked as cancelled.')
+        self.set_status(request, queryset, 'cancelled')
     mark_as_cancelled.short_description = "Mark selected bookings as cancelled"
     
     def mark_as_completed(self, request, queryset):
-        updated = queryset.update(status='completed')
-        self.message_user(request, f'{updated} bookings marked as completed.')
-    mark_as_completed.short_description = "Mark selected bookings as completed"
\ No newline at end of file
+        self.set_status(request, queryset, 'completed')
+    mark_as_completed.short_description = "Mark selected bookings as completed"
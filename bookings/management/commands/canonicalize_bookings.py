@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from bookings.models import Booking, normalize_package_type, normalize_travel_month, travel_year
+
+
+class Command(BaseCommand):
+    help = 'Fill package_type_key/travel_month_key/travel_year for bookings saved before they existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fields = ['package_type_key', 'travel_month_key', 'travel_year']
+        queryset = Booking.objects.only('id', 'package_type', 'travel_month', *fields).order_by('id')
+
+        batch = []
+        updated = 0
+        for booking in queryset.iterator(chunk_size=batch_size):
+            package_type_key = normalize_package_type(booking.package_type)
+            travel_month_key = normalize_travel_month(booking.travel_month)
+            year = travel_year(booking.travel_month)
+            current = (booking.package_type_key, booking.travel_month_key, booking.travel_year)
+            if current == (package_type_key, travel_month_key, year):
+                continue
+            booking.package_type_key = package_type_key
+            booking.travel_month_key = travel_month_key
+            booking.travel_year = year
+            batch.append(booking)
+            if len(batch) >= batch_size:
+                updated += Booking.objects.bulk_update(batch, fields)
+                batch = []
+        if batch:
+            updated += Booking.objects.bulk_update(batch, fields)
+
+        self.stdout.write(self.style.SUCCESS(f'Canonicalized {updated} bookings'))
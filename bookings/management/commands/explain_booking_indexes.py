@@ -0,0 +1,70 @@
+import random
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from bookings.models import Booking
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large booking table and print the query plan and timing of each '
+        'booking access pattern. Seeded rows are rolled back unless --keep is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users = self.seed(options['rows'], options['users'], options['batch_size'])
+            self.explain(users, options['repeat'])
+            if not options['keep']:
+                transaction.set_rollback(True)
+                self.stdout.write('Rolling back seeded rows')
+
+    def seed(self, rows, user_count, batch_size):
+        self.stdout.write(f'Seeding {user_count} users and {rows} bookings...')
+        users = User.objects.bulk_create([
+            User(username=f'bench-user-{i}', email=f'bench{i}@example.com', password='!')
+            for i in range(user_count)
+        ], batch_size=batch_size)
+
+        statuses = [choice for choice, _ in Booking.BOOKING_STATUS]
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            Booking.objects.bulk_create([
+                Booking(
+                    user=random.choice(users), name='Bench pilgrim', email='bench@example.com',
+                    phone='9999999999', status=random.choice(statuses)
+                )
+                for _ in range(min(batch_size, rows - offset))
+            ], batch_size=batch_size)
+        self.stdout.write(f'Seeded in {time.perf_counter() - started:.1f}s')
+        return users
+
+    def explain(self, users, repeat):
+        user = random.choice(users)
+        booking = Booking.objects.filter(user=user).only('booking_id').first()
+        patterns = {
+            'track/detail/update/cancel': Booking.objects.filter(
+                booking_id=booking.booking_id, user=user
+            ),
+            'my bookings': Booking.objects.filter(user=user).order_by('-created_at')[:20],
+            'admin list by status': Booking.objects.filter(status='confirmed').order_by('-created_at')[:20],
+            'admin list keyset': Booking.objects.order_by('-created_at', '-id')[:20],
+        }
+
+        for label, queryset in patterns.items():
+            started = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{label}: {elapsed_ms:.2f} ms'))
+            self.stdout.write(queryset.explain())
@@ -1,10 +1,60 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from packages.models import Package
+from packages.inventory import reserve_seats, release_seats
+import calendar
+import re
 import uuid
 
 User = get_user_model()
 
+MONTHS = [month.lower() for month in calendar.month_name[1:]]
+# Full and abbreviated month names; anything else isn't a month
+MONTH_NAMES = {
+    **{month: month for month in MONTHS},
+    **{abbr.lower(): month for abbr, month in zip(calendar.month_abbr[1:], MONTHS)},
+    'sept': 'september',
+}
+YEAR = re.compile(r'\b(19|20)\d{2}\b')
+
+def normalize_text(value):
+    return ' '.join((value or '').split()).lower()
+
+def normalize_package_type(value):
+    """Map free-text package types onto Package codes ('Umrah ' -> 'umrah')"""
+    return Package.canonical_type(value) or normalize_text(value)
+
+def parse_travel_month(value):
+    """
+    (month, year) of a travel month such as 'Jan', 'JANUARY ', 'Sept. 2025' or
+    '2026'; either may be None, not both. Raises ValueError for anything else.
+    """
+    month = year = None
+    for word in normalize_text(value).replace(',', ' ').split():
+        if month is None and word.rstrip('.') in MONTH_NAMES:
+            month = MONTH_NAMES[word.rstrip('.')]
+        elif year is None and YEAR.fullmatch(word):
+            year = int(word)
+        else:
+            raise ValueError(f'Not a travel month: {value!r}')
+    if month is None and year is None:
+        raise ValueError(f'Not a travel month: {value!r}')
+    return month, year
+
+def normalize_travel_month(value):
+    """'Jan', 'JANUARY ' and 'january 2026' all become 'january' (see travel_year)"""
+    try:
+        month, year = parse_travel_month(value)
+    except ValueError:
+        # Free text saved before travel months were validated is kept as it is
+        return normalize_text(value)
+    return month or ''
+
+def travel_year(value):
+    """The year in a travel month ('January 2026' -> 2026), or None"""
+    match = YEAR.search(value or '')
+    return int(match.group()) if match else None
+
 class Booking(models.Model):
     BOOKING_STATUS = [
         ('pending', 'Pending'),
@@ -13,6 +63,15 @@ class Booking(models.Model):
         ('completed', 'Completed'),
     ]
     
+    # Statuses a booking may move from, per target status (used by bulk transitions).
+    # Cancelled is terminal here because reactivating has to re-reserve seats one by one.
+    STATUS_TRANSITIONS = {
+        'pending': ['confirmed'],
+        'confirmed': ['pending'],
+        'cancelled': ['pending', 'confirmed'],
+        'completed': ['confirmed'],
+    }
+    
     booking_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
     package = models.ForeignKey(Package, on_delete=models.CASCADE, related_name='bookings', null=True, blank=True)
@@ -25,6 +84,10 @@ class Booking(models.Model):
     # Booking details
     package_type = models.CharField(max_length=100, default="Standard")
     travel_month = models.CharField(max_length=50, default="January")
+    # Canonical forms of the two free-text fields above, used for indexed filtering
+    package_type_key = models.CharField(max_length=100, blank=True, editable=False)
+    travel_month_key = models.CharField(max_length=50, blank=True, editable=False)
+    travel_year = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
     nights = models.IntegerField(default=1)
     passengers = models.IntegerField(default=1)
     
@@ -39,11 +102,50 @@ class Booking(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='booking_created_id_idx'),
+            # Admin list filters on status, newest first
+            models.Index(fields=['status', '-created_at'], name='booking_status_created_idx'),
+            # "My bookings" lists a user's bookings, newest first
+            models.Index(fields=['user', '-created_at'], name='booking_user_created_idx'),
+            # Admin list filters on the canonical package type / travel month
+            models.Index(fields=['package_type_key', '-created_at'], name='booking_type_created_idx'),
+            models.Index(fields=['travel_month_key', '-created_at'], name='booking_month_created_idx'),
+        ]
 
     def __str__(self):
         return f"Booking {self.booking_id} - {self.name}"
 
+    @property
+    def holds_seats(self):
+        return self.package_id is not None and self.status != 'cancelled'
+
+    def reserve_seats(self):
+        """Take this booking's seats on its package; raises CapacityExceeded"""
+        if self.holds_seats:
+            reserve_seats(self.package, self.departure_date, self.passengers, exclude=self.pk)
+
+    def release_seats(self):
+        if self.holds_seats:
+            release_seats(self.package_id, self.departure_date, self.passengers)
+
+    def set_status(self, status):
+        """Save a status change, returning or re-taking seats; raises CapacityExceeded"""
+        with transaction.atomic():
+            if status == 'cancelled':
+                self.release_seats()
+            elif self.status == 'cancelled':
+                self.status = status
+                self.reserve_seats()
+            self.status = status
+            self.save()
+
     def save(self, *args, **kwargs):
+        self.package_type_key = normalize_package_type(self.package_type)
+        self.travel_month_key = normalize_travel_month(self.travel_month)
+        self.travel_year = travel_year(self.travel_month)
+        
         # Auto-calculate total_amount if package is linked
         if self.package and self.passengers:
             self.total_amount = self.package.effective_price * self.passengers
@@ -1,7 +1,10 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Booking
+from .models import Booking, parse_travel_month
 from packages.serializers import PackageListSerializer
 from packages.models import Package
+from packages.inventory import CapacityExceeded
+from packages.resolver import resolve_package
 
 class BookingSerializer(serializers.ModelSerializer):
     package_details = PackageListSerializer(source='package', read_only=True)
@@ -30,22 +33,41 @@ class BookingSerializer(serializers.ModelSerializer):
         
         # Try to find matching package based on package_type if no package ID provided
         if not validated_data.get('package') and validated_data.get('package_type'):
-            try:
-                package = Package.objects.filter(
-                    package_type__icontains=validated_data['package_type']
-                ).first()
-                if package:
-                    validated_data['package'] = package
-            except Package.DoesNotExist:
-                pass
+            package = resolve_package(validated_data['package_type'])
+            if package:
+                validated_data['package'] = package
         
-        # Calculate total amount if package is available
-        if validated_data.get('package') and validated_data.get('passengers'):
-            package = validated_data['package']
-            passengers = validated_data['passengers']
-            validated_data['total_amount'] = package.effective_price * passengers
-        
-        return super().create(validated_data)
+        # Booking.save() calculates total_amount from the package
+        with transaction.atomic():
+            booking = Booking(**validated_data)
+            self.reserve_seats(booking)
+            booking.save()
+        return booking
+
+    def update(self, instance, validated_data):
+        # Swap the old reservation for the new one; both roll back if seats run out
+        with transaction.atomic():
+            instance.release_seats()
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            self.reserve_seats(instance)
+            instance.save()
+        return instance
+
+    def reserve_seats(self, booking):
+        try:
+            booking.reserve_seats()
+        except CapacityExceeded:
+            raise serializers.ValidationError("Not enough seats left on this package")
+
+    def validate_travel_month(self, value):
+        try:
+            month, year = parse_travel_month(value)
+        except ValueError:
+            month = None
+        if month is None:
+            raise serializers.ValidationError("Enter a month, e.g. 'January' or 'Jan 2026'")
+        return value
 
     def validate(self, data):
         # Ensure required fields from frontend are present
@@ -80,6 +102,18 @@ class BookingTrackingSerializer(serializers.ModelSerializer):
             'status_display', 'created_at', 'updated_at'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Join the package and load only the columns this serializer emits"""
+        return queryset.select_related('package').only(
+            'booking_id', 'name', 'email', 'phone', 'package_type', 'travel_month',
+            'nights', 'passengers', 'departure_date', 'total_amount', 'status',
+            'created_at', 'updated_at',
+            'package__id', 'package__name', 'package__package_type',
+            'package__short_description', 'package__price', 'package__discounted_price',
+            'package__duration_days', 'package__image', 'package__image_variants', 'package__is_featured',
+        )
+
 class BookingListSerializer(serializers.ModelSerializer):
     """Simplified serializer for listing bookings"""
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -106,4 +140,10 @@ class BookingStatusUpdateSerializer(serializers.ModelSerializer):
             valid_statuses = ['pending', 'confirmed', 'completed', 'cancelled']
             if data['status'] not in valid_statuses:
                 raise serializers.ValidationError("Invalid status value")
-        return data
\ No newline at end of file
+        return data
+
+class BookingBulkStatusSerializer(serializers.Serializer):
+    booking_ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=1000
+    )
+    status = serializers.ChoiceField(choices=Booking.BOOKING_STATUS)
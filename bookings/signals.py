@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Booking
+
+
+@receiver(post_delete, sender=Booking)
+def release_booking_seats(sender, instance, **kwargs):
+    """Deleted bookings (admin, cascades from users) give their seats back"""
+    instance.release_seats()
@@ -1,3 +1,471 @@
-from django.test import TestCase
+import json
+import uuid
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from authentication.models import UserActivity
+from packages.models import Package, SeatInventory
+from packages.resolver import VERSION_KEY, clear_resolver_cache, get_version
+from .models import Booking, normalize_travel_month, parse_travel_month
 
-# Create your tests here.
+User = get_user_model()
+
+
+class AdminBookingListQueryTest(TestCase):
+    """The admin booking list must not issue one query per booking"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant = User.objects.create_user(
+            username='consultant', email='consultant@example.com',
+            password='password123', role='consulting'
+        )
+        cls.package = Package.objects.create(
+            name='Classic Umrah', package_type='umrah', description='Umrah package',
+            price=1000, duration_days=10, max_passengers=40,
+            image='package_images/umrah.jpg', includes='Visa'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.consultant)
+
+    def create_bookings(self, count):
+        for i in range(count):
+            Booking.objects.create(
+                user=self.consultant, package=self.package, name=f'Pilgrim {i}',
+                email=f'pilgrim{i}@example.com', phone='9999999999', package_type='umrah'
+            )
+
+    def fetch_list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin-booking-list'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.create_bookings(2)
+        _, small_page_queries = self.fetch_list()
+
+        self.create_bookings(15)
+        response, large_page_queries = self.fetch_list()
+
+        self.assertEqual(response.data['count'], 17)
+        self.assertEqual(small_page_queries, large_page_queries)
+        # One COUNT for the paginator and one joined SELECT for the page
+        self.assertEqual(large_page_queries, 2)
+
+    def test_package_details_are_serialized(self):
+        self.create_bookings(1)
+        response, _ = self.fetch_list()
+
+        package_details = response.data['results'][0]['package_details']
+        self.assertEqual(package_details['name'], 'Classic Umrah')
+        self.assertEqual(package_details['effective_price'], self.package.price)
+
+
+class AdminBookingCursorPaginationTest(TestCase):
+    """Cursor mode walks every booking once, even with identical timestamps"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant = User.objects.create_user(
+            username='consultant', email='consultant@example.com',
+            password='password123', role='consulting'
+        )
+        for i in range(45):
+            Booking.objects.create(
+                user=cls.consultant, name=f'Pilgrim {i}', email=f'pilgrim{i}@example.com',
+                phone='9999999999'
+            )
+        # Force ties on created_at so the id tie-breaker is exercised
+        first = Booking.objects.order_by('created_at').first()
+        Booking.objects.filter(pk__lte=first.pk + 20).update(created_at=first.created_at)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.consultant)
+
+    def test_cursor_pages_cover_all_rows_without_count(self):
+        url = reverse('admin-booking-list') + '?pagination=cursor'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['booking_id'] for row in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(len(set(seen)), 45)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse('admin-booking-list') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_mode_is_default(self):
+        response = self.client.get(reverse('admin-booking-list'))
+        self.assertEqual(response.data['count'], 45)
+
+
+class AdminBookingExportTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant = User.objects.create_user(
+            username='consultant', email='consultant@example.com',
+            password='password123', role='consulting'
+        )
+        for i, booking_status in enumerate(['pending', 'confirmed', 'confirmed']):
+            Booking.objects.create(
+                user=cls.consultant, name=f'Pilgrim {i}', email=f'pilgrim{i}@example.com',
+                phone='9999999999', status=booking_status
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.consultant)
+
+    def test_csv_export_streams_filtered_rows(self):
+        response = self.client.get(reverse('admin-booking-export'), {'status': 'confirmed'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'booking_id')
+        self.assertEqual(len(lines), 3)
+
+    def test_ndjson_export(self):
+        response = self.client.get(reverse('admin-booking-export'), {'output': 'ndjson'})
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+
+@override_settings(AUDIT_LOG={'ASYNC': False})
+class AdminBulkStatusTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant = User.objects.create_user(
+            username='consultant', email='consultant@example.com',
+            password='password123', role='consulting'
+        )
+        cls.bookings = {
+            booking_status: Booking.objects.create(
+                user=cls.consultant, name=booking_status, email=f'{booking_status}@example.com',
+                phone='9999999999', status=booking_status
+            )
+            for booking_status in ['pending', 'confirmed', 'completed', 'cancelled']
+        }
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.consultant)
+
+    def test_bulk_cancel_reports_outcome_per_booking(self):
+        missing = uuid.uuid4()
+        ids = [str(booking.booking_id) for booking in self.bookings.values()] + [str(missing)]
+
+        response = self.client.post(
+            reverse('admin-booking-bulk-status'),
+            {'booking_ids': ids, 'status': 'cancelled'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        results = {row['booking_id']: row['result'] for row in response.data['results']}
+        self.assertEqual(results[str(self.bookings['pending'].booking_id)], 'updated')
+        self.assertEqual(results[str(self.bookings['confirmed'].booking_id)], 'updated')
+        self.assertEqual(results[str(self.bookings['completed'].booking_id)], 'invalid_transition')
+        self.assertEqual(results[str(self.bookings['cancelled'].booking_id)], 'unchanged')
+        self.assertEqual(results[str(missing)], 'not_found')
+
+        self.bookings['completed'].refresh_from_db()
+        self.assertEqual(self.bookings['completed'].status, 'completed')
+        self.assertEqual(UserActivity.objects.filter(action='BOOKING_STATUS_CHANGED').count(), 2)
+
+
+class BookingNormalizedFilterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant = User.objects.create_user(
+            username='consultant', email='consultant@example.com',
+            password='password123', role='consulting'
+        )
+        for package_type, travel_month in [
+            ('Umrah', 'Jan'), (' umrah ', 'JANUARY 2026'), ('Umrah', 'January 2027'), ('Hajj', 'June 2026'),
+        ]:
+            Booking.objects.create(
+                user=cls.consultant, name='Pilgrim', email='pilgrim@example.com', phone='9999999999',
+                package_type=package_type, travel_month=travel_month
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.consultant)
+
+    def test_filters_match_canonical_values(self):
+        url = reverse('admin-booking-list')
+        self.assertEqual(self.client.get(url, {'package_type': 'UMRAH'}).data['count'], 3)
+        self.assertEqual(self.client.get(url, {'travel_month': 'january'}).data['count'], 3)
+        self.assertEqual(self.client.get(url, {'travel_month': 'jun'}).data['count'], 1)
+
+    def test_year_in_travel_month_narrows_the_filter(self):
+        url = reverse('admin-booking-list')
+        self.assertEqual(self.client.get(url, {'travel_month': 'January 2026'}).data['count'], 1)
+        self.assertEqual(self.client.get(url, {'travel_month': 'jan 2027'}).data['count'], 1)
+        self.assertEqual(self.client.get(url, {'travel_month': '2026'}).data['count'], 2)
+
+    def test_canonicalize_command_backfills_keys(self):
+        Booking.objects.update(package_type_key='', travel_month_key='', travel_year=None)
+        call_command('canonicalize_bookings', stdout=StringIO())
+        self.assertEqual(Booking.objects.filter(package_type_key='umrah', travel_month_key='january').count(), 3)
+        self.assertEqual(Booking.objects.filter(travel_month_key='january', travel_year=2026).count(), 1)
+
+    def test_month_names_are_parsed_strictly(self):
+        self.assertEqual(parse_travel_month('Sept. 2025'), ('september', 2025))
+        self.assertEqual(parse_travel_month(' MAY '), ('may', None))
+        self.assertEqual(parse_travel_month('2026'), (None, 2026))
+        for value in ['Mayo', 'Junk', 'Janu', 'May June', '', '26']:
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                parse_travel_month(value)
+        # Free text saved before validation keeps its own key rather than a guessed month
+        self.assertEqual(normalize_travel_month(' Junk '), 'junk')
+
+
+class BookingCreateQueryTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='pilgrim', email='pilgrim@example.com', password='password123'
+        )
+        cls.package = Package.objects.create(
+            name='Classic Umrah', package_type='umrah', description='Umrah package',
+            price=1000, discounted_price=900, duration_days=10, max_passengers=40,
+            image='package_images/umrah.jpg', includes='Visa'
+        )
+
+    def setUp(self):
+        clear_resolver_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_booking(self, **extra):
+        return self.client.post(reverse('booking-create'), {
+            'name': 'Pilgrim', 'email': 'pilgrim@example.com', 'phone': '9999999999',
+            'package_type': 'Umrah', 'travel_month': 'January', 'nights': 10, 'passengers': 2
+        }, format='json', **extra)
+
+    def test_unrecognised_travel_month_is_rejected(self):
+        for travel_month in ['Junk', 'Mayo', '2026']:
+            with self.subTest(travel_month=travel_month):
+                response = self.client.post(reverse('booking-create'), {
+                    'name': 'Pilgrim', 'email': 'pilgrim@example.com', 'phone': '9999999999',
+                    'package_type': 'Umrah', 'travel_month': travel_month, 'nights': 10, 'passengers': 2
+                }, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('travel_month', response.data)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_auto_matched_booking_costs_reservation_and_insert(self):
+        self.create_booking()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.create_booking()
+        statements = [
+            query['sql'].split()[0] for query in ctx.captured_queries
+            if 'SAVEPOINT' not in query['sql']
+        ]
+        self.assertEqual(statements, ['UPDATE', 'INSERT'])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['booking']['package_details']['id'], self.package.pk)
+        self.assertEqual(Decimal(response.data['booking']['total_amount']), Decimal('1800'))
+
+    def test_retry_with_idempotency_key_replays_without_queries(self):
+        cache.clear()
+        first = self.create_booking(HTTP_IDEMPOTENCY_KEY='retry-1')
+
+        with self.assertNumQueries(0):
+            retry = self.create_booking(HTTP_IDEMPOTENCY_KEY='retry-1')
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data['booking_id'], first.data['booking_id'])
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_package_save_refreshes_resolver(self):
+        self.create_booking()
+        self.package.discounted_price = None
+        with self.captureOnCommitCallbacks(execute=True):
+            self.package.save()
+
+        response = self.create_booking()
+        self.assertEqual(Decimal(response.data['booking']['total_amount']), Decimal('2000'))
+
+    def test_other_workers_drop_resolved_packages_on_version_bump(self):
+        self.create_booking()
+        # Another worker's save: the row and the shared version change, this
+        # process's LRU is left as it was
+        Package.objects.filter(pk=self.package.pk).update(discounted_price=None)
+        cache.set(VERSION_KEY, get_version() + 1, None)
+
+        response = self.create_booking()
+        self.assertEqual(Decimal(response.data['booking']['total_amount']), Decimal('2000'))
+
+
+class SeatReservationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='pilgrim', email='pilgrim@example.com', password='password123'
+        )
+        cls.package = Package.objects.create(
+            name='Hajj 2027', package_type='hajj', description='Hajj package',
+            price=5000, duration_days=21, max_passengers=5,
+            image='package_images/hajj.jpg', includes='Visa'
+        )
+
+    def setUp(self):
+        clear_resolver_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def book(self, passengers):
+        return self.client.post(reverse('booking-create'), {
+            'package': self.package.pk, 'name': 'Pilgrim', 'email': 'pilgrim@example.com',
+            'phone': '9999999999', 'package_type': 'Hajj', 'travel_month': 'June',
+            'nights': 21, 'passengers': passengers
+        }, format='json')
+
+    def test_capacity_is_never_exceeded(self):
+        self.assertEqual(self.book(3).status_code, 201)
+        self.assertEqual(self.book(3).status_code, 400)
+        self.assertEqual(self.book(2).status_code, 201)
+        self.assertEqual(Booking.objects.count(), 2)
+        self.assertEqual(SeatInventory.objects.get(package=self.package).reserved, 5)
+
+    def test_cancelling_returns_seats(self):
+        booking_id = self.book(5).data['booking_id']
+        self.client.delete(reverse('cancel-booking', args=[booking_id]))
+
+        self.assertEqual(self.book(5).status_code, 201)
+
+    def test_list_exposes_remaining_seats(self):
+        self.book(2)
+        response = self.client.get(reverse('package-list'))
+        self.assertEqual(response.data['results'][0]['seats_remaining'], 3)
+
+    def legacy_booking(self, passengers):
+        """A booking made before seat inventory existed"""
+        return Booking.objects.create(
+            user=self.user, package=self.package, name='Pilgrim', email='pilgrim@example.com',
+            phone='9999999999', passengers=passengers
+        )
+
+    def test_first_reservation_counts_existing_bookings(self):
+        self.legacy_booking(4)
+
+        self.assertEqual(self.book(2).status_code, 400)
+        self.assertEqual(self.book(1).status_code, 201)
+        self.assertEqual(SeatInventory.objects.get(package=self.package).reserved, 5)
+
+    def test_sync_command_recounts_inventory(self):
+        self.legacy_booking(2)
+        SeatInventory.objects.create(package=self.package, capacity=5, reserved=0)
+
+        call_command('sync_seat_inventory', stdout=StringIO())
+        self.assertEqual(SeatInventory.objects.get(package=self.package).reserved, 2)
+
+    def test_deleting_booking_returns_seats(self):
+        booking_id = self.book(5).data['booking_id']
+        Booking.objects.get(booking_id=booking_id).delete()
+
+        self.assertEqual(SeatInventory.objects.get(package=self.package).reserved, 0)
+
+
+@override_settings(AUDIT_LOG={'ASYNC': False})
+class BookingAdminSeatTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='root', email='root@example.com', password='password123'
+        )
+        cls.package = Package.objects.create(
+            name='Hajj 2027', package_type='hajj', description='Hajj package',
+            price=5000, duration_days=21, max_passengers=5,
+            image='package_images/hajj.jpg', includes='Visa'
+        )
+
+    def setUp(self):
+        clear_resolver_cache()
+        self.client.force_login(self.admin)
+        self.booking = Booking(
+            user=self.admin, package=self.package, name='Pilgrim', email='pilgrim@example.com',
+            phone='9999999999', passengers=3
+        )
+        self.booking.reserve_seats()
+        self.booking.save()
+
+    def reserved(self):
+        return SeatInventory.objects.get(package=self.package).reserved
+
+    def test_cancel_action_releases_seats(self):
+        self.client.post(reverse('admin:bookings_booking_changelist'), {
+            'action': 'mark_as_cancelled', '_selected_action': [self.booking.pk]
+        })
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'cancelled')
+        self.assertEqual(self.reserved(), 0)
+
+    def test_confirm_action_skips_bookings_that_no_longer_fit(self):
+        self.booking.set_status('cancelled')
+        self.package.bookings.create(
+            user=self.admin, name='Other', email='other@example.com', phone='1', passengers=3
+        ).reserve_seats()
+
+        self.client.post(reverse('admin:bookings_booking_changelist'), {
+            'action': 'mark_as_confirmed', '_selected_action': [self.booking.pk]
+        })
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, 'cancelled')
+        self.assertEqual(self.reserved(), 3)
+
+    def test_delete_releases_seats(self):
+        self.client.post(reverse('admin:bookings_booking_delete', args=[self.booking.pk]), {'post': 'yes'})
+
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(self.reserved(), 0)
+
+    def test_change_form_moves_seats_and_rejects_overbooking(self):
+        url = reverse('admin:bookings_booking_change', args=[self.booking.pk])
+        data = {
+            'user': self.admin.pk, 'package': self.package.pk, 'status': 'pending',
+            'name': 'Pilgrim', 'email': 'pilgrim@example.com', 'phone': '9999999999',
+            'package_type': 'Hajj', 'travel_month': 'June', 'nights': 21,
+            'departure_date': '', 'special_requirements': '', 'total_amount': '15000',
+        }
+
+        response = self.client.post(url, {**data, 'passengers': 6})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Not enough seats left on this package')
+
+        self.client.post(url, {**data, 'passengers': 5})
+        self.assertEqual(self.reserved(), 5)
+        self.client.post(url, {**data, 'passengers': 5, 'status': 'cancelled'})
+        self.assertEqual(self.reserved(), 0)
@@ -3,6 +3,7 @@ from django.urls import path
 from .views import (
     BookingCreateView, BookingListView, track_booking, booking_detail,
     update_booking, cancel_booking, AdminBookingListView ,admin_booking_detail,admin_update_booking,admin_cancel_booking,
+    admin_export_bookings, admin_bulk_update_status,
 )
 
 urlpatterns = [
@@ -16,6 +17,8 @@ urlpatterns = [
     
     # Admin endpoints
     path('admin/bookings/', AdminBookingListView.as_view(), name='admin-booking-list'),
+    path('admin/bookings/export/', admin_export_bookings, name='admin-booking-export'),
+    path('admin/bookings/bulk-status/', admin_bulk_update_status, name='admin-booking-bulk-status'),
       path('admin/bookings-details/<uuid:booking_id>/', admin_booking_detail, name='admin-booking-details'),
       path('admin/bookings/update/<uuid:booking_id>/', admin_update_booking, name='admin-update-booking'),
     path('admin/bookings/cancel/<uuid:booking_id>/', admin_cancel_booking, name='admin-cancel-booking'),
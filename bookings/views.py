@@ -1,14 +1,25 @@
+import csv
+import json
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from authentication.audit import build_activity, log_user_activities
 from authentication.permissions import IsConsultingOrAbove
-from .models import Booking
+from packages.inventory import CapacityExceeded, release_seats
+from tawheedUmrahBack.idempotency import IdempotentCreateMixin
+from tawheedUmrahBack.pagination import KeysetPagination
+from .models import Booking, normalize_package_type, normalize_text, parse_travel_month
 from .serializers import (
-    BookingSerializer, BookingTrackingSerializer, BookingListSerializer,BookingStatusUpdateSerializer
+    BookingSerializer, BookingTrackingSerializer, BookingListSerializer,BookingStatusUpdateSerializer,
+    BookingBulkStatusSerializer
 )
 
-class BookingCreateView(generics.CreateAPIView):
+class BookingCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -87,35 +98,90 @@ def cancel_booking(request, booking_id):
             'error': 'Cannot cancel completed booking'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    booking.status = 'cancelled'
-    booking.save()
+    booking.set_status('cancelled')
 
     return Response({
         'success': True,
         'message': 'Booking cancelled successfully'
     })
 
+def filter_bookings(queryset, params):
+    """Apply the admin status/package_type/travel_month filters"""
+    status_param = params.get('status')
+    package_type = params.get('package_type')
+    travel_month = params.get('travel_month')
+    
+    if status_param:
+        queryset = queryset.filter(status=status_param)
+    if package_type:
+        queryset = queryset.filter(package_type_key=normalize_package_type(package_type))
+    if travel_month:
+        # 'January' matches every January, 'January 2026' only that year, '2026' the whole year
+        try:
+            month, year = parse_travel_month(travel_month)
+        except ValueError:
+            month, year = normalize_text(travel_month), None
+        if month:
+            queryset = queryset.filter(travel_month_key=month)
+        if year is not None:
+            queryset = queryset.filter(travel_year=year)
+    
+    return queryset
+
 class AdminBookingListView(generics.ListAPIView):
     queryset = Booking.objects.all()
     serializer_class = BookingTrackingSerializer
     permission_classes = [IsConsultingOrAbove]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        
-        # Add filtering options
-        status_param = self.request.query_params.get('status')
-        package_type = self.request.query_params.get('package_type')
-        travel_month = self.request.query_params.get('travel_month')
-        
-        if status_param:
-            queryset = queryset.filter(status=status_param)
-        if package_type:
-            queryset = queryset.filter(package_type__icontains=package_type)
-        if travel_month:
-            queryset = queryset.filter(travel_month__icontains=travel_month)
-        
-        return queryset
+        queryset = BookingTrackingSerializer.setup_eager_loading(super().get_queryset())
+        return filter_bookings(queryset, self.request.query_params)
+
+# Columns written by the booking export, in order
+EXPORT_FIELDS = (
+    'booking_id', 'name', 'email', 'phone', 'package__name', 'package_type',
+    'travel_month', 'nights', 'passengers', 'departure_date', 'total_amount',
+    'status', 'created_at',
+)
+EXPORT_CHUNK_SIZE = 2000
+
+class Echo:
+    """File-like object whose write() hands the line back to the csv writer's caller"""
+    def write(self, value):
+        return value
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsConsultingOrAbove])
+def admin_export_bookings(request):
+    """Admin: Stream filtered bookings as CSV (default) or NDJSON (?output=ndjson)"""
+    output = request.query_params.get('output', 'csv')
+    if output not in ('csv', 'ndjson'):
+        return Response({
+            'error': 'output must be csv or ndjson'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    # values_list + iterator keeps memory flat: rows are fetched in chunks and never cached
+    rows = filter_bookings(Booking.objects.all(), request.query_params).values_list(
+        *EXPORT_FIELDS
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    if output == 'ndjson':
+        response = StreamingHttpResponse(stream_ndjson(rows), content_type='application/x-ndjson')
+    else:
+        response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="bookings.{output}"'
+    return response
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsConsultingOrAbove])
@@ -150,8 +216,12 @@ def admin_update_booking(request, booking_id):
             'error': 'Invalid status value'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    booking.status = new_status
-    booking.save()
+    try:
+        booking.set_status(new_status)
+    except CapacityExceeded:
+        return Response({
+            'error': 'Not enough seats left on this package'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
     return Response({
         'success': True,
@@ -170,10 +240,70 @@ def admin_cancel_booking(request, booking_id):
             'error': 'Cannot cancel completed booking'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    booking.status = 'cancelled'
-    booking.save()
+    booking.set_status('cancelled')
 
     return Response({
         'success': True,
         'message': 'Booking cancelled successfully'
-    })
\ No newline at end of file
+    })
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, IsConsultingOrAbove])
+def admin_bulk_update_status(request):
+    """Admin: Move many bookings to one status, reporting the outcome per booking_id"""
+    serializer = BookingBulkStatusSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    booking_ids = list(dict.fromkeys(serializer.validated_data['booking_ids']))
+    new_status = serializer.validated_data['status']
+    allowed_from = Booking.STATUS_TRANSITIONS[new_status]
+
+    with transaction.atomic():
+        rows = list(
+            Booking.objects.select_for_update()
+            .filter(booking_id__in=booking_ids)
+            .values_list('booking_id', 'status', 'package_id', 'departure_date', 'passengers')
+        )
+        current = {row[0]: row[1] for row in rows}
+        # The status filter enforces the transition rules in SQL
+        updated = Booking.objects.filter(
+            booking_id__in=booking_ids, status__in=allowed_from
+        ).update(status=new_status, updated_at=timezone.now())
+
+        if new_status == 'cancelled':
+            # Hand seats back with one UPDATE per package departure
+            released = {}
+            for _, old_status, package_id, departure_date, passengers in rows:
+                if package_id and old_status in allowed_from:
+                    key = (package_id, departure_date)
+                    released[key] = released.get(key, 0) + passengers
+            for (package_id, departure_date), seats in released.items():
+                release_seats(package_id, departure_date, seats)
+
+    results = []
+    activities = []
+    for booking_id in booking_ids:
+        old_status = current.get(booking_id)
+        if old_status is None:
+            result = 'not_found'
+        elif old_status == new_status:
+            result = 'unchanged'
+        elif old_status in allowed_from:
+            result = 'updated'
+            activities.append(build_activity(
+                request.user,
+                'BOOKING_STATUS_CHANGED',
+                f'Booking {booking_id}: {old_status} -> {new_status}',
+                request.META.get('REMOTE_ADDR')
+            ))
+        else:
+            result = 'invalid_transition'
+        results.append({'booking_id': str(booking_id), 'status': old_status, 'result': result})
+
+    log_user_activities(activities)
+
+    return Response({
+        'success': True,
+        'message': f'{updated} bookings updated to {new_status}',
+        'updated': updated,
+        'results': results
+    })
@@ -1,6 +1,6 @@
 # admin.py
 from django.contrib import admin
-from .models import HeroSection, Component, Package, HomePage
+from .models import HeroSection, Component, Package, HomePage, VideoUpload
 
 
 @admin.register(HeroSection)
@@ -101,4 +101,11 @@ class HomePageAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         })
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(VideoUpload)
+class VideoUploadAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'target', 'object_id', 'offset', 'size', 'status', 'created_by', 'updated_at')
+    list_filter = ('status', 'target')
+    readonly_fields = ('id', 'offset', 'created_at', 'updated_at')
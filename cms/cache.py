@@ -0,0 +1,90 @@
+# cache.py
+"""
+Response cache for the public CMS endpoints.
+
+Every cached response is stored under a key that embeds the current
+version of its group ('hero', 'components', 'packages', 'homepage').
+Saving or deleting a model bumps its group version (see signals.py), so
+stale entries are never read again and simply expire. ETag/Last-Modified
+validators are cached the same way, so a conditional hit costs no query.
+
+The versions only reach every worker through a shared cache, so nothing is
+cached unless ``CMS_CACHE_ENABLED`` is set (the default when REDIS_URL is).
+"""
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+from tawheedUmrahBack.conditional import ConditionalGetMixin, compute_validators, conditional_get
+
+
+def version_key(group):
+    return f'cms:version:{group}'
+
+
+def get_version(group):
+    return cache.get_or_set(version_key(group), time.time_ns(), None)
+
+
+def invalidate(group):
+    """Make every cached response of this group unreachable"""
+    cache.set(version_key(group), time.time_ns(), None)
+
+
+def response_key(group, version, request, kind='response'):
+    # Host and scheme are part of the key because serializers build absolute media URLs
+    query = sorted(request.query_params.lists())
+    raw = f'{request.build_absolute_uri(request.path)}?{query}'
+    return f'cms:{kind}:{group}:{version}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def cache_response(group):
+    """Cache successful GET responses of a view under the group's version"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or not settings.CMS_CACHE_ENABLED:
+                return view_func(request, *args, **kwargs)
+
+            key = response_key(group, get_version(group), request)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, settings.CMS_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def cached_validators(group, request, compute):
+    """Return compute()'s (etag, last_modified), cached under the group's version"""
+    if not settings.CMS_CACHE_ENABLED:
+        return compute()
+    key = response_key(group, get_version(group), request, kind='validators')
+    validators = cache.get(key)
+    if validators is None:
+        validators = compute()
+        cache.set(key, validators, settings.CMS_CACHE_TIMEOUT)
+    return validators
+
+
+def conditional_queryset(group, get_queryset):
+    """Conditional GET for function views over get_queryset(), with cached validators"""
+    return conditional_get(lambda request: cached_validators(
+        group, request, lambda: compute_validators(request, get_queryset())
+    ))
+
+
+class CachedConditionalMixin(ConditionalGetMixin):
+    """Conditional GET whose validators are cached under ``cache_group``"""
+    cache_group = None
+
+    def get_validators(self, request):
+        compute = super().get_validators
+        return cached_validators(self.cache_group, request, lambda: compute(request))
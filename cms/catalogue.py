@@ -0,0 +1,65 @@
+# catalogue.py
+"""
+Precomputed package catalogue.
+
+All active packages are fetched with one query, serialized once and
+grouped in memory by their package_type prefix. When CMS_CACHE_ENABLED, the
+result is cached under the 'packages' cache version and rebuilt after every
+committed package write (see signals.py), so readers normally never build it
+themselves. Conditional GET validators are derived from it as well.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from tawheedUmrahBack.conditional import make_validators
+from .cache import get_version
+from .models import Package
+from .serializers import PackageSerializer
+
+CATEGORY_PREFIXES = (
+    ('umrah_packages', 'umrah_'),
+    ('hajj_packages', 'hajj_'),
+    ('ramadan_packages', 'ramadan_'),
+)
+
+
+def catalogue_key():
+    return f'cms:catalogue:{get_version("packages")}'
+
+
+def build_catalogue():
+    instances = list(Package.objects.filter(is_active=True).order_by('package_type'))
+    packages = PackageSerializer(instances, many=True).data
+
+    categories = {name: [] for name, _ in CATEGORY_PREFIXES}
+    for package in packages:
+        for name, prefix in CATEGORY_PREFIXES:
+            if package['package_type'].startswith(prefix):
+                categories[name].append(package)
+                break
+
+    return {
+        'categories': categories,
+        'packages': sorted(packages, key=lambda package: package['id']),
+        'last_modified': max((package.updated_at for package in instances), default=None),
+    }
+
+
+def refresh_catalogue():
+    catalogue = build_catalogue()
+    cache.set(catalogue_key(), catalogue, settings.CMS_CACHE_TIMEOUT)
+    return catalogue
+
+
+def get_catalogue():
+    """Return {'categories': {...}, 'packages': [...], 'last_modified': ...} of active packages"""
+    if not settings.CMS_CACHE_ENABLED:
+        return build_catalogue()
+    catalogue = cache.get(catalogue_key())
+    if catalogue is None:
+        catalogue = refresh_catalogue()
+    return catalogue
+
+
+def catalogue_validators(request):
+    catalogue = get_catalogue()
+    return make_validators(request, catalogue['last_modified'], len(catalogue['packages']))
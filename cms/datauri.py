@@ -0,0 +1,95 @@
+"""
+Incremental decoding of base64 data URIs.
+
+The payload is decoded a slice at a time straight into an upload file, the
+same way Django's upload handlers store multipart files: in memory up to
+``FILE_UPLOAD_MAX_MEMORY_SIZE`` and in a temporary file on disk beyond that.
+This only removes the intermediate copies made while decoding. The request
+body and the JSON string parsed from it are still held in full, so peak
+memory is roughly halved, not bounded. And since ``DATA_UPLOAD_MAX_MEMORY_SIZE``
+caps JSON bodies below what decodes to ``FILE_UPLOAD_MAX_MEMORY_SIZE``, the
+temporary file is only used when that limit is raised. Large images should be
+sent as multipart uploads, which the image fields accept as well and Django
+streams to disk. Image formats are sniffed from the first bytes rather than
+by opening the whole image.
+"""
+import base64
+import binascii
+import re
+from io import BytesIO
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+
+# Multiple of 4, so every slice decodes on its own
+CHUNK_CHARS = 64 * 1024
+WHITESPACE = re.compile(r'\s+')
+
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+)
+
+
+class InvalidDataURI(ValueError):
+    pass
+
+
+def split_data_uri(data):
+    """Return (header, start of the base64 payload) without copying the payload"""
+    marker = data.find('base64,', 0, 256)
+    if marker == -1:
+        raise InvalidDataURI('Not a base64 data URI')
+    return data[:marker], marker + len('base64,')
+
+
+def decode_into(data, start, file):
+    """Decode data[start:] into file slice by slice; returns the decoded size"""
+    size = 0
+    carry = ''
+    for offset in range(start, len(data), CHUNK_CHARS):
+        chunk = carry + data[offset:offset + CHUNK_CHARS]
+        if WHITESPACE.search(chunk):
+            chunk = WHITESPACE.sub('', chunk)
+        usable = len(chunk) - len(chunk) % 4
+        carry = chunk[usable:]
+        try:
+            decoded = base64.b64decode(chunk[:usable], validate=True)
+        except binascii.Error as exc:
+            raise InvalidDataURI(str(exc))
+        file.write(decoded)
+        size += len(decoded)
+    if carry:
+        raise InvalidDataURI('Incorrect base64 padding')
+    return size
+
+
+def decode_data_uri(data, name, content_type=''):
+    """Decode a base64 data URI into an UploadedFile named name"""
+    header, start = split_data_uri(data)
+    estimated_size = (len(data) - start) * 3 // 4
+    if estimated_size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+        upload = TemporaryUploadedFile(name, content_type, estimated_size, None)
+        upload.size = decode_into(data, start, upload.file)
+    else:
+        buffer = BytesIO()
+        size = decode_into(data, start, buffer)
+        upload = InMemoryUploadedFile(buffer, None, name, content_type, size, None)
+    upload.seek(0)
+    return header, upload
+
+
+def sniff_image_format(file):
+    """Image format from the file's magic bytes, or None; leaves the file at position 0"""
+    head = file.read(16)
+    file.seek(0)
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    for signature, image_format in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    return None
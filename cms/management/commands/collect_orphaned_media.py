@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand
+from tawheedUmrahBack.orphans import collect_orphans
+from cms.uploads import discard_stale_parts
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f'{size:.1f}{unit}'
+        size /= 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete media files no model refers to any more (replaced uploads and '
+        'their derivatives) and part files of abandoned video uploads. Files '
+        'younger than --min-age seconds are left alone.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be reclaimed')
+        parser.add_argument('--quarantine', metavar='DIR', help='Move orphans here instead of deleting them')
+        parser.add_argument('--min-age', type=int, help='Seconds; defaults to MEDIA_GC["MIN_AGE"]')
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = collect_orphans(
+            dry_run=options['dry_run'], quarantine_dir=options['quarantine'],
+            min_age=options['min_age'], batch_size=options['batch_size'],
+        )
+        parts, part_bytes = discard_stale_parts(dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - started
+
+        if options['dry_run']:
+            action = 'Would reclaim'
+        elif options['quarantine']:
+            action = 'Quarantined'
+        else:
+            action = 'Reclaimed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {format_size(result.reclaimed + part_bytes)}: {result.orphaned} orphaned '
+            f'of {result.scanned} media files and {parts} stale upload parts in {elapsed:.1f}s'
+        ))
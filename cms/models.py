@@ -1,5 +1,7 @@
 
 # models.py
+import uuid
+from django.conf import settings
 from django.db import models
 
 class HeroSection(models.Model):
@@ -7,6 +9,10 @@ class HeroSection(models.Model):
     subtitle = models.TextField(blank=True)
     background_video = models.FileField(upload_to='hero_videos/', blank=True, null=True)
     background_image = models.ImageField(upload_to='hero_images/', blank=True, null=True)
+    # Responsive WebP copies, filled in by tawheedUmrahBack.derivatives
+    background_image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Container format, duration and size, filled in by tawheedUmrahBack.tasks
+    background_video_info = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -31,6 +37,8 @@ class Component(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='component_images/', blank=True, null=True)
+    # Responsive WebP copies, filled in by tawheedUmrahBack.derivatives
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     order = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -61,6 +69,8 @@ class Package(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     currency = models.CharField(max_length=10, default='USD')
     image = models.ImageField(upload_to='package_images/', blank=True, null=True)
+    # Responsive WebP copies, filled in by tawheedUmrahBack.derivatives
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     features = models.TextField(help_text="Enter features separated by new lines", blank=True)
     duration_days = models.IntegerField(default=7)
     is_active = models.BooleanField(default=True)
@@ -82,6 +92,10 @@ class HomePage(models.Model):
     content = models.TextField(help_text="Main content for the homepage")
     background_video = models.FileField(upload_to='homepage_videos/', blank=True, null=True)
     background_image = models.ImageField(upload_to='homepage_images/', blank=True, null=True)
+    # Responsive WebP copies, filled in by tawheedUmrahBack.derivatives
+    background_image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Container format, duration and size, filled in by tawheedUmrahBack.tasks
+    background_video_info = models.JSONField(default=dict, blank=True, editable=False)
     welcome_title = models.CharField(max_length=200, default="Welcome")
     welcome_subtitle = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
@@ -92,4 +106,34 @@ class HomePage(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"Homepage Content - {self.welcome_title}"
\ No newline at end of file
+        return f"Homepage Content - {self.welcome_title}"
+
+class VideoUpload(models.Model):
+    """A resumable video upload, attached to its hero section or homepage once complete"""
+    TARGETS = [
+        ('hero', 'Hero Section'),
+        ('homepage', 'Homepage'),
+    ]
+    STATUSES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    target = models.CharField(max_length=20, choices=TARGETS)
+    object_id = models.PositiveIntegerField()
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUSES, default='uploading')
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
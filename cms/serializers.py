@@ -1,12 +1,11 @@
 # serializers.py
 from rest_framework import serializers
-from .models import HeroSection, Component, Package, HomePage
+from .models import HeroSection, Component, Package, HomePage, VideoUpload
+from .uploads import TARGET_MODELS, VIDEO_EXTENSIONS, file_extension, get_setting as get_upload_setting
 from authentication.permissions import IsAdminOrSuperAdmin, IsSuperAdmin
-import base64
 import uuid
-from django.core.files.base import ContentFile
-from PIL import Image
-from io import BytesIO
+from tawheedUmrahBack.derivatives import SrcsetField
+from .datauri import InvalidDataURI, decode_data_uri, sniff_image_format
 
 class Base64ImageField(serializers.ImageField):
     """
@@ -15,19 +14,20 @@ class Base64ImageField(serializers.ImageField):
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            if 'base64,' in data:
-                header, data = data.split('base64,')
+            if 'base64,' in data[:256]:
                 try:
-                    decoded_file = base64.b64decode(data)
-                except TypeError:
+                    _, data = decode_data_uri(data, 'upload')
+                except InvalidDataURI:
                     self.fail('invalid_image')
 
-                # Use Pillow to get image format
-                image = Image.open(BytesIO(decoded_file))
-                file_extension = image.format.lower()
+                # Format from the magic bytes; the full Pillow check runs in
+                # the process_image task once the file is stored
+                file_extension = sniff_image_format(data)
+                if file_extension is None:
+                    self.fail('invalid_image')
 
-                file_name = f"{uuid.uuid4().hex[:12]}.{file_extension}"
-                data = ContentFile(decoded_file, name=file_name)
+                data.name = f"{uuid.uuid4().hex[:12]}.{file_extension}"
+                return serializers.FileField.to_internal_value(self, data)
 
         return super().to_internal_value(data)
 
@@ -39,11 +39,10 @@ class Base64VideoField(serializers.FileField):
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:video'):
-            if 'base64,' in data:
-                header, data = data.split('base64,')
+            if 'base64,' in data[:256]:
                 try:
-                    decoded_file = base64.b64decode(data)
-                except TypeError:
+                    header, data = decode_data_uri(data, 'upload')
+                except InvalidDataURI:
                     raise serializers.ValidationError("Invalid video file")
 
                 # Extract video format from header
@@ -53,8 +52,7 @@ class Base64VideoField(serializers.FileField):
                 else:
                     file_extension = 'mp4'  # default extension
 
-                file_name = f"{uuid.uuid4().hex[:12]}.{file_extension}"
-                data = ContentFile(decoded_file, name=file_name)
+                data.name = f"{uuid.uuid4().hex[:12]}.{file_extension}"
 
         return super().to_internal_value(data)
 
@@ -62,14 +60,15 @@ class Base64VideoField(serializers.FileField):
 class HeroSectionSerializer(serializers.ModelSerializer):
     background_image = Base64ImageField(max_length=None, use_url=True, required=False)
     background_video = Base64VideoField(max_length=None, use_url=True, required=False)
+    background_image_srcset = SrcsetField(source='background_image_variants')
     
     class Meta:
         model = HeroSection
         fields = [
-            'id', 'title', 'subtitle', 'background_video', 
-            'background_image', 'is_active', 'created_at', 'updated_at'
+            'id', 'title', 'subtitle', 'background_video', 'background_video_info',
+            'background_image', 'background_image_srcset', 'is_active', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['background_video_info', 'created_at', 'updated_at']
 
     def to_representation(self, instance):
         """
@@ -86,24 +85,26 @@ class HeroSectionSerializer(serializers.ModelSerializer):
 
 class ComponentSerializer(serializers.ModelSerializer):
     image = Base64ImageField(max_length=None, use_url=True, required=False)
+    image_srcset = SrcsetField(source='image_variants')
     
     class Meta:
         model = Component
         fields = [
             'id', 'name', 'component_type', 'title', 'description', 
-            'image', 'is_active', 'order', 'created_at', 'updated_at'
+            'image', 'image_srcset', 'is_active', 'order', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
 
 
 class PackageSerializer(serializers.ModelSerializer):
     image = Base64ImageField(max_length=None, use_url=True, required=False)
+    image_srcset = SrcsetField(source='image_variants')
     
     class Meta:
         model = Package
         fields = [
             'id', 'package_type', 'title', 'description', 'price', 
-            'currency', 'duration_days', 'image', 'features', 
+            'currency', 'duration_days', 'image', 'image_srcset', 'features', 
             'is_active', 'is_featured', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
@@ -123,15 +124,16 @@ class PackageUpdateSerializer(serializers.ModelSerializer):
 class HomePageSerializer(serializers.ModelSerializer):
     background_image = Base64ImageField(max_length=None, use_url=True, required=False)
     background_video = Base64VideoField(max_length=None, use_url=True, required=False)
+    background_image_srcset = SrcsetField(source='background_image_variants')
     
     class Meta:
         model = HomePage
         fields = [
             'id', 'welcome_title', 'welcome_subtitle', 'content', 
-            'background_video', 'background_image', 'is_active', 
-            'created_at', 'updated_at'
+            'background_video', 'background_video_info', 'background_image', 'background_image_srcset',
+            'is_active', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['background_video_info', 'created_at', 'updated_at']
 
     def to_representation(self, instance):
         """
@@ -177,4 +179,37 @@ class HomePageUpdateSerializer(serializers.ModelSerializer):
         if instance.background_image and request:
             data['background_image'] = request.build_absolute_uri(instance.background_image.url)
         
-        return data
\ No newline at end of file
+        return data
+
+
+class VideoUploadSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = VideoUpload
+        fields = [
+            'id', 'target', 'object_id', 'filename', 'size', 'offset',
+            'status', 'chunk_size', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'offset', 'status', 'created_at', 'updated_at']
+
+    def get_chunk_size(self, obj):
+        return get_upload_setting('CHUNK_SIZE')
+
+    def validate_filename(self, value):
+        if file_extension(value) not in VIDEO_EXTENSIONS:
+            raise serializers.ValidationError(
+                f"Unsupported video type. Allowed: {', '.join(sorted(VIDEO_EXTENSIONS))}"
+            )
+        return value
+
+    def validate_size(self, value):
+        max_size = get_upload_setting('MAX_SIZE')
+        if not 0 < value <= max_size:
+            raise serializers.ValidationError(f"Video size must be between 1 byte and {max_size} bytes")
+        return value
+
+    def validate(self, attrs):
+        if not TARGET_MODELS[attrs['target']].objects.filter(pk=attrs['object_id']).exists():
+            raise serializers.ValidationError({'object_id': 'No such hero section or homepage'})
+        return attrs
@@ -0,0 +1,41 @@
+# signals.py
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from tawheedUmrahBack.media import watch_image, watch_video
+from .cache import invalidate
+from .catalogue import refresh_catalogue
+from .models import HeroSection, Component, Package, HomePage
+
+CACHE_GROUPS = {
+    HeroSection: 'hero',
+    Component: 'components',
+    Package: 'packages',
+    HomePage: 'homepage',
+}
+
+
+def invalidate_cms_cache(sender, **kwargs):
+    """Admin and API writes both go through save()/delete(), so this covers both"""
+    group = CACHE_GROUPS[sender]
+
+    def bump():
+        # Only once the write is visible to other connections: a reader that
+        # saw the new version before the commit would cache the old rows under it
+        invalidate(group)
+        if group == 'packages' and settings.CMS_CACHE_ENABLED:
+            refresh_catalogue()
+
+    transaction.on_commit(bump)
+
+
+for model in CACHE_GROUPS:
+    post_save.connect(invalidate_cms_cache, sender=model)
+    post_delete.connect(invalidate_cms_cache, sender=model)
+
+watch_image(HeroSection, 'background_image', 'background_image_variants')
+watch_video(HeroSection, 'background_video', 'background_video_info')
+watch_image(Component, 'image', 'image_variants')
+watch_image(Package, 'image', 'image_variants')
+watch_image(HomePage, 'background_image', 'background_image_variants')
+watch_video(HomePage, 'background_video', 'background_video_info')
@@ -1,3 +1,506 @@
-from django.test import TestCase
+import base64
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from authentication.models import CustomUser
+from tawheedUmrahBack import media
+from tawheedUmrahBack.orphans import collect_orphans
+from tawheedUmrahBack.probing import probe_video_file
+from .models import Component, HeroSection, Package, VideoUpload
+from .cache import get_version
+from .datauri import InvalidDataURI, decode_data_uri, sniff_image_format
+from .uploads import discard_stale_parts, part_path
 
-# Create your tests here.
+
+@override_settings(CMS_CACHE_ENABLED=True)
+class PublicCmsCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.package = Package.objects.create(
+            package_type='umrah_classic', title='Classic Umrah',
+            description='Umrah package', price=1000
+        )
+
+    def test_cache_hit_skips_database(self):
+        url = reverse('packages-by-category')
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['umrah_packages'][0]['title'], 'Classic Umrah')
+
+    def test_catalogue_is_built_with_one_query(self):
+        Package.objects.create(package_type='hajj_classic', title='Classic Hajj', description='Hajj', price=5000)
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            grouped = self.client.get(reverse('packages-by-category'))
+        with self.assertNumQueries(0):
+            flat = self.client.get(reverse('all-packages'))
+
+        self.assertEqual(len(grouped.data['hajj_packages']), 1)
+        self.assertEqual(grouped.data['ramadan_packages'], [])
+        self.assertEqual(flat.data['count'], 2)
+
+    def test_save_invalidates_cached_response(self):
+        url = reverse('packages-by-category')
+        self.client.get(url)
+
+        self.package.title = 'Premium Umrah'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.package.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['umrah_packages'][0]['title'], 'Premium Umrah')
+
+    def test_version_is_bumped_only_after_commit(self):
+        version = get_version('packages')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.package.title = 'Premium Umrah'
+            self.package.save()
+            self.assertEqual(get_version('packages'), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_version('packages'), version)
+
+    def test_query_params_are_part_of_the_key(self):
+        Component.objects.create(name='About', component_type='about', title='About us')
+        Component.objects.create(name='Gallery', component_type='gallery', title='Gallery')
+        url = reverse('component-list')
+
+        all_components = self.client.get(url)
+        gallery_only = self.client.get(url, {'type': 'gallery'})
+
+        self.assertEqual(all_components.data['count'], 2)
+        self.assertEqual(gallery_only.data['count'], 1)
+
+    def test_matching_etag_returns_not_modified_without_queries(self):
+        url = reverse('packages-by-category')
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.package.price = 1200
+        with self.captureOnCommitCallbacks(execute=True):
+            self.package.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_all_packages_route_is_not_taken_for_a_package_type(self):
+        response = self.client.get('/api/cms/packages/all/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(self.client.get('/api/cms/packages/umrah_classic/').data['title'], 'Classic Umrah')
+
+    @override_settings(CMS_CACHE_ENABLED=False)
+    def test_nothing_is_cached_without_a_shared_cache(self):
+        url = reverse('packages-by-category')
+        self.client.get(url)
+        # A save in another worker: the row changes, this process hears nothing
+        Package.objects.filter(pk=self.package.pk).update(title='Premium Umrah')
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['umrah_packages'][0]['title'], 'Premium Umrah')
+        self.assertEqual(self.client.get(reverse('all-packages')).data['packages'][0]['title'], 'Premium Umrah')
+
+
+class VideoUploadTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, VIDEO_UPLOAD={
+            'TEMP_DIR': Path(self.media_root) / 'parts', 'CHUNK_SIZE': 4, 'BUFFER_SIZE': 2,
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='password123', role='admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.hero = HeroSection.objects.create(title='Welcome')
+        self.video = b'0123456789'
+
+    def start(self):
+        response = self.client.post(reverse('video-upload-create'), {
+            'target': 'hero', 'object_id': self.hero.pk, 'filename': 'intro.MP4', 'size': len(self.video)
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return reverse('video-upload', args=[response.data['id']])
+
+    def send(self, url, offset, chunk):
+        return self.client.generic(
+            'PATCH', url, chunk, content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def test_chunks_are_assembled_and_attached(self):
+        url = self.start()
+        for offset in range(0, len(self.video), 4):
+            response = self.send(url, offset, self.video[offset:offset + 4])
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(response.data['status'], 'complete')
+        self.hero.refresh_from_db()
+        self.assertTrue(self.hero.background_video.name.endswith('.mp4'))
+        with self.hero.background_video.open('rb') as video:
+            self.assertEqual(video.read(), self.video)
+        self.assertFalse(part_path(VideoUpload.objects.get()).exists())
+
+    def test_resume_from_reported_offset(self):
+        url = self.start()
+        self.send(url, 0, self.video[:4])
+
+        stale = self.send(url, 0, self.video[:4])
+        self.assertEqual(stale.status_code, 409)
+        self.assertEqual(stale.data['offset'], 4)
+
+        offset = self.client.get(url).data['offset']
+        self.send(url, offset, self.video[offset:offset + 4])
+        self.send(url, offset + 4, self.video[offset + 4:])
+        with HeroSection.objects.get().background_video.open('rb') as video:
+            self.assertEqual(video.read(), self.video)
+
+    def test_oversized_chunk_and_bad_type_are_rejected(self):
+        url = self.start()
+        self.assertEqual(self.send(url, 0, self.video[:5]).status_code, 400)
+
+        response = self.client.post(reverse('video-upload-create'), {
+            'target': 'hero', 'object_id': self.hero.pk, 'filename': 'intro.exe', 'size': 10
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class DataURIDecodingTest(TestCase):
+
+    def png_data_uri(self, size=(4, 4)):
+        buffer = BytesIO()
+        # Noise, so the PNG doesn't compress below the in-memory threshold
+        Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(buffer, 'PNG')
+        return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+    def test_chunked_decode_matches_b64decode(self):
+        payload = bytes(range(256)) * 1000
+        encoded = base64.encodebytes(payload).decode()  # wrapped every 76 chars
+        header, upload = decode_data_uri(f'data:application/octet-stream;base64,{encoded}', 'blob')
+
+        self.assertEqual(header, 'data:application/octet-stream;')
+        self.assertEqual(upload.size, len(payload))
+        self.assertEqual(upload.read(), payload)
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_large_payload_is_spooled_to_disk(self):
+        header, upload = decode_data_uri(self.png_data_uri((200, 200)), 'image')
+        self.assertIsInstance(upload, TemporaryUploadedFile)
+        self.assertEqual(sniff_image_format(upload), 'png')
+        self.assertEqual(Image.open(upload.temporary_file_path()).size, (200, 200))
+
+    def test_invalid_payload_is_rejected(self):
+        with self.assertRaises(InvalidDataURI):
+            decode_data_uri('data:image/png;base64,not*base64', 'image')
+
+    def test_image_field_accepts_data_uri(self):
+        admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='password123', role='admin'
+        )
+        component = Component.objects.create(name='About', component_type='about', title='About us')
+        client = APIClient()
+        client.force_authenticate(admin)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            response = client.patch(
+                reverse('component-update', args=[component.pk]), {'image': self.png_data_uri()}, format='json'
+            )
+            bad = client.patch(
+                reverse('component-update', args=[component.pk]), {'image': 'data:image/png;base64,AAAA'}, format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        component.refresh_from_db()
+        self.assertTrue(component.image.name.endswith('.png'))
+        self.assertEqual(bad.status_code, 400)
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_image_field_accepts_multipart_upload(self):
+        admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='password123', role='admin'
+        )
+        component = Component.objects.create(name='About', component_type='about', title='About us')
+        client = APIClient()
+        client.force_authenticate(admin)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        buffer = BytesIO()
+        Image.frombytes('RGB', (200, 200), os.urandom(200 * 200 * 3)).save(buffer, 'PNG')
+
+        with override_settings(MEDIA_ROOT=media_root):
+            response = client.patch(reverse('component-update', args=[component.pk]), {
+                'image': SimpleUploadedFile('about.png', buffer.getvalue(), 'image/png')
+            }, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        component.refresh_from_db()
+        self.assertTrue(component.image.name.endswith('.png'))
+
+
+class ImageDerivativeTest(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, CELERY_TASK_ALWAYS_EAGER=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def image(self, width, height=200):
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), 'green').save(buffer, 'JPEG')
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue())
+
+    def create_component(self, width):
+        component = Component(name='About', component_type='about', title='About us')
+        with self.captureOnCommitCallbacks(execute=True):
+            component.image.save('photo.jpg', self.image(width))
+        component.refresh_from_db()
+        return component
+
+    def test_webp_variants_are_generated_below_original_width(self):
+        component = self.create_component(700)
+
+        variants = component.image_variants
+        self.assertEqual(variants['source'], component.image.name)
+        self.assertEqual(list(variants['widths']), ['320', '640'])
+        with default_storage.open(variants['widths']['640']) as derivative:
+            self.assertEqual(Image.open(derivative).format, 'WEBP')
+            self.assertEqual(Image.open(derivative).size, (640, 183))
+
+        response = self.client.get(reverse('component-list'))
+        srcset = response.data['results'][0]['image_srcset']
+        self.assertTrue(srcset['320'].startswith('http://testserver/media/derivatives/component_images/'))
+
+    def test_small_images_are_not_upscaled(self):
+        component = self.create_component(100)
+        self.assertEqual(list(component.image_variants['widths']), ['100'])
+
+    def test_replacing_image_regenerates_variants(self):
+        component = self.create_component(700)
+        first = component.image_variants
+
+        with self.captureOnCommitCallbacks(execute=True):
+            component.image.save('new.jpg', self.image(400))
+        component.refresh_from_db()
+
+        self.assertNotEqual(component.image_variants['source'], first['source'])
+        self.assertEqual(list(component.image_variants['widths']), ['320'])
+
+    def test_replaced_image_and_its_variants_are_deleted(self):
+        component = self.create_component(700)
+        old_files = [component.image.name, *component.image_variants['widths'].values()]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            component.image.save('new.jpg', self.image(400))
+
+        for name in old_files:
+            self.assertFalse(default_storage.exists(name))
+        self.assertTrue(default_storage.exists(component.image.name))
+
+    def test_deleting_row_deletes_its_files(self):
+        component = self.create_component(700)
+        names = [component.image.name, *component.image_variants['widths'].values()]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            component.delete()
+
+        for name in names:
+            self.assertFalse(default_storage.exists(name))
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=False, CELERY_BROKER_URL='memory://')
+    def test_without_broker_tasks_leave_the_committing_thread(self):
+        executor = mock.Mock()
+        with mock.patch.object(media, 'get_local_executor', return_value=executor):
+            component = self.create_component(700)
+
+        self.assertEqual(component.image_variants, {})
+        executor.submit.assert_called_once()
+        self.assertEqual(executor.submit.call_args.args[1].name, 'tawheedUmrahBack.tasks.process_image')
+
+    def test_unreadable_image_is_discarded_by_the_task(self):
+        component = Component(name='About', component_type='about', title='About us')
+        # Passes the upload's magic byte sniffing but isn't a decodable PNG
+        broken = SimpleUploadedFile('broken.png', b'\x89PNG\r\n\x1a\n' + b'\x00' * 64)
+        with self.captureOnCommitCallbacks(execute=True):
+            component.image.save('broken.png', broken)
+        name = component.image.name
+
+        component.refresh_from_db()
+        self.assertFalse(component.image)
+        self.assertEqual(component.image_variants, {})
+        self.assertFalse(default_storage.exists(name))
+
+
+def mp4_bytes(timescale=1000, duration=12500):
+    """A minimal MP4: ftyp, a media data box and a moov with only its header"""
+    ftyp = b'\x00\x00\x00\x10ftypisom\x00\x00\x02\x00'
+    mdat = b'\x00\x00\x00\x18mdat' + b'\x00' * 16
+    mvhd_body = b'\x00' * 4 + b'\x00' * 8 + timescale.to_bytes(4, 'big') + duration.to_bytes(4, 'big') + b'\x00' * 80
+    mvhd = (8 + len(mvhd_body)).to_bytes(4, 'big') + b'mvhd' + mvhd_body
+    moov = (8 + len(mvhd)).to_bytes(4, 'big') + b'moov' + mvhd
+    return ftyp + mdat + moov
+
+
+class VideoProbeTest(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, CELERY_TASK_ALWAYS_EAGER=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_mp4_duration_is_read_from_movie_header(self):
+        info = probe_video_file(BytesIO(mp4_bytes()))
+        self.assertEqual(info, {'format': 'mp4', 'duration': 12.5, 'size': len(mp4_bytes())})
+
+    def test_malformed_box_sizes_do_not_hang_or_raise(self):
+        ftyp = b'\x00\x00\x00\x10ftypisom\x00\x00\x02\x00'
+        cases = [
+            # 64-bit size of 0 would otherwise seek backwards forever
+            ftyp + b'\x00\x00\x00\x01free' + b'\x00' * 8,
+            # 32-bit sizes below the header length
+            ftyp + b'\x00\x00\x00\x04free' + b'\x00' * 8,
+            # ftyp running to the end of the file
+            b'\x00\x00\x00\x00ftypisom\x00\x00\x02\x00',
+            # moov cut off in the middle of its header
+            ftyp + b'\x00\x00\x00\x20moov\x00\x00\x00\x18mvhd\x00',
+        ]
+        for data in cases:
+            with self.subTest(data=data):
+                info = probe_video_file(BytesIO(data))
+                self.assertEqual(info['format'], 'mp4')
+                self.assertIsNone(info['duration'])
+
+    def test_unknown_container_has_no_format(self):
+        self.assertIsNone(probe_video_file(BytesIO(b'not a video at all'))['format'])
+
+    def test_saved_video_is_probed_after_commit(self):
+        hero = HeroSection.objects.create(title='Hero')
+        with self.captureOnCommitCallbacks(execute=True):
+            hero.background_video.save('intro.mp4', SimpleUploadedFile('intro.mp4', mp4_bytes()))
+
+        hero.refresh_from_db()
+        self.assertEqual(hero.background_video_info['source'], hero.background_video.name)
+        self.assertEqual(hero.background_video_info['duration'], 12.5)
+        self.assertEqual(hero.background_video_info['format'], 'mp4')
+
+
+class OrphanCollectorTest(TestCase):
+
+    def setUp(self):
+        self.media_root = Path(tempfile.mkdtemp())
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        settings_override = override_settings(
+            MEDIA_ROOT=str(self.media_root), VIDEO_UPLOAD={'TEMP_DIR': str(self.temp_dir)},
+            CELERY_TASK_ALWAYS_EAGER=True,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        buffer = BytesIO()
+        Image.new('RGB', (400, 100), 'green').save(buffer, 'JPEG')
+        self.component = Component(name='About', component_type='about', title='About us')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.component.image.save('photo.jpg', SimpleUploadedFile('photo.jpg', buffer.getvalue()))
+        self.component.refresh_from_db()
+
+    def write(self, name, size=100, age=2 * 24 * 60 * 60):
+        path = self.media_root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x' * size)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_only_old_unreferenced_files_are_deleted(self):
+        orphan = self.write('component_images/replaced.jpg', size=300)
+        recent = self.write('hero_videos/just-uploaded.mp4', age=60)
+
+        result = collect_orphans(batch_size=1)
+
+        self.assertFalse(orphan.exists())
+        self.assertTrue(recent.exists())
+        self.assertTrue(default_storage.exists(self.component.image.name))
+        for name in self.component.image_variants['widths'].values():
+            self.assertTrue(default_storage.exists(name))
+        self.assertEqual((result.orphaned, result.reclaimed), (1, 300))
+        self.assertEqual(result.scanned, 4)
+
+    def test_dry_run_and_quarantine(self):
+        self.write('package_images/old.png', size=50)
+        quarantine_dir = self.media_root / 'quarantine'
+
+        dry_run = collect_orphans(dry_run=True)
+        self.assertEqual(dry_run.reclaimed, 50)
+        self.assertTrue((self.media_root / 'package_images/old.png').exists())
+
+        result = collect_orphans(quarantine_dir=str(quarantine_dir))
+        self.assertEqual(result.reclaimed, 50)
+        self.assertTrue((quarantine_dir / 'package_images/old.png').exists())
+        # Quarantined files aren't collected again
+        self.assertEqual(collect_orphans(quarantine_dir=str(quarantine_dir)).orphaned, 0)
+
+    def test_upload_parts_under_media_root_are_left_alone(self):
+        parts = self.media_root / 'video_uploads'
+        part = self.write('video_uploads/in-progress.part')
+
+        with override_settings(VIDEO_UPLOAD={'TEMP_DIR': str(parts)}):
+            result = collect_orphans()
+
+        self.assertTrue(part.exists())
+        self.assertEqual(result.orphaned, 0)
+
+    def test_stale_upload_parts_are_discarded(self):
+        hero = HeroSection.objects.create(title='Hero')
+        active = VideoUpload.objects.create(target='hero', object_id=hero.pk, filename='a.mp4', size=10)
+        abandoned = VideoUpload.objects.create(target='hero', object_id=hero.pk, filename='b.mp4', size=10)
+        VideoUpload.objects.filter(pk=abandoned.pk).update(updated_at=timezone.now() - timedelta(days=30))
+        for upload in (active, abandoned):
+            part_path(upload).write_bytes(b'x' * 10)
+            os.utime(part_path(upload), (time.time() - 30 * 24 * 60 * 60,) * 2)
+
+        self.assertEqual(discard_stale_parts(), (1, 10))
+        self.assertTrue(part_path(active).exists())
+        self.assertFalse(part_path(abandoned).exists())
+        self.assertFalse(VideoUpload.objects.filter(pk=abandoned.pk).exists())
+
+    def test_command_reports_reclaimed_bytes(self):
+        self.write('hero_images/old.jpg', size=2048)
+        out = StringIO()
+        call_command('collect_orphaned_media', stdout=out)
+        self.assertIn('Reclaimed 2.0KB: 1 orphaned', out.getvalue())
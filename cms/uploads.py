@@ -0,0 +1,129 @@
+"""
+Resumable uploads for hero and homepage background videos.
+
+A client creates a VideoUpload with the final size, then sends the file as
+raw request bodies (PATCH with an ``Upload-Offset`` header), each at most
+``VIDEO_UPLOAD['CHUNK_SIZE']`` bytes. Chunks are copied from the request
+stream to a part file in small buffers, so memory use doesn't depend on
+the video size. After an interrupted chunk the client asks for the current
+offset and resends from there. Once the last byte arrives, the part file is
+saved to the target's ``background_video`` through the configured storage.
+"""
+import os
+import tempfile
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+from .models import HeroSection, HomePage, VideoUpload
+
+DEFAULTS = {
+    'TEMP_DIR': None,
+    'MAX_SIZE': 1024 * 1024 * 1024,
+    'CHUNK_SIZE': 8 * 1024 * 1024,
+    'BUFFER_SIZE': 64 * 1024,
+    'STALE_AFTER': 7 * 24 * 60 * 60,
+}
+
+TARGET_MODELS = {
+    'hero': HeroSection,
+    'homepage': HomePage,
+}
+
+VIDEO_EXTENSIONS = {'mp4', 'webm', 'mov', 'm4v', 'ogg', 'ogv'}
+
+
+def get_setting(name):
+    return getattr(settings, 'VIDEO_UPLOAD', {}).get(name, DEFAULTS[name])
+
+
+def part_dir():
+    temp_dir = get_setting('TEMP_DIR')
+    if temp_dir is None:
+        return Path(settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir()) / 'video_uploads'
+    return Path(temp_dir)
+
+
+def part_path(upload):
+    return part_dir() / f'{upload.pk}.part'
+
+
+def file_extension(filename):
+    return os.path.splitext(filename)[1].lstrip('.').lower()
+
+
+def write_chunk(upload, stream, length):
+    """
+    Copy length bytes from stream into the part file at upload.offset.
+
+    Returns the number of bytes written; fewer than length means the client
+    went away mid-chunk and the same range has to be sent again.
+    """
+    path = part_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    buffer_size = get_setting('BUFFER_SIZE')
+    remaining = length
+    with open(path, 'r+b' if path.exists() else 'wb') as part:
+        part.seek(upload.offset)
+        while remaining:
+            data = stream.read(min(buffer_size, remaining))
+            if not data:
+                break
+            part.write(data)
+            remaining -= len(data)
+        # Drop anything left over from an earlier interrupted attempt
+        part.truncate()
+    return length - remaining
+
+
+def attach_video(upload):
+    """Save the finished part file as the target's background_video and remove it"""
+    instance = TARGET_MODELS[upload.target].objects.get(pk=upload.object_id)
+    path = part_path(upload)
+    name = f"{uuid.uuid4().hex[:12]}.{file_extension(upload.filename)}"
+    with open(path, 'rb') as part:
+        instance.background_video.save(name, File(part), save=True)
+    path.unlink()
+    return instance
+
+
+def discard_part(upload):
+    part_path(upload).unlink(missing_ok=True)
+
+
+def discard_stale_parts(max_age=None, dry_run=False):
+    """
+    Remove the part files of uploads abandoned for more than max_age seconds
+    (``VIDEO_UPLOAD['STALE_AFTER']``), and of uploads that no longer exist.
+    Abandoned VideoUpload rows are deleted too. Returns (files, bytes).
+    """
+    max_age = get_setting('STALE_AFTER') if max_age is None else max_age
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    live = {
+        f'{pk}.part' for pk in
+        VideoUpload.objects.filter(status='uploading', updated_at__gte=cutoff).values_list('pk', flat=True)
+    }
+
+    files = reclaimed = 0
+    try:
+        entries = os.scandir(part_dir())
+    except FileNotFoundError:
+        entries = None
+    if entries is not None:
+        with entries:
+            for entry in entries:
+                if not entry.name.endswith('.part') or entry.name in live:
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime > cutoff.timestamp():
+                    continue
+                files += 1
+                reclaimed += stat.st_size
+                if not dry_run:
+                    os.remove(entry.path)
+
+    if not dry_run:
+        VideoUpload.objects.filter(status='uploading', updated_at__lt=cutoff).delete()
+    return files, reclaimed
@@ -5,7 +5,8 @@ from .views import (
     PackageListView, PackageDetailView, PackageUpdateView, PackageCreateView,
     HomePageView, HomePageUpdateView, HomePageCreateView,
     get_packages_by_category, update_package_price, get_active_homepage,
-    create_package, create_homepage,get_all_packages
+    create_package, create_homepage,get_all_packages,
+    VideoUploadCreateView, VideoUploadView
 )
 
 urlpatterns = [
@@ -22,6 +23,8 @@ urlpatterns = [
     path('packages/create/', PackageCreateView.as_view(), name='package-create'),  # NEW
     path('packages/add/', create_package, name='package-add'),  # NEW Function-based
     path('packages/categories/', get_packages_by_category, name='packages-by-category'),
+    # Must precede packages/<str:package_type>/, which would otherwise match 'all'
+    path('packages/all/', get_all_packages, name='all-packages'),
     path('packages/<str:package_type>/', PackageDetailView.as_view(), name='package-detail'),
     path('packages/<str:package_type>/update/', PackageUpdateView.as_view(), name='package-update'),
     path('packages/<str:package_type>/price/', update_package_price, name='package-price-update'),
@@ -32,5 +35,8 @@ urlpatterns = [
     path('homepage/add/', create_homepage, name='homepage-add'),  # NEW Function-based
     path('homepage/active/', get_active_homepage, name='homepage-active'),
     path('homepage/<int:pk>/', HomePageUpdateView.as_view(), name='homepage-update'),
-    path('packages/all/', get_all_packages, name='all-packages'), 
+
+    # Resumable video uploads for hero sections and homepages
+    path('uploads/videos/', VideoUploadCreateView.as_view(), name='video-upload-create'),
+    path('uploads/videos/<uuid:pk>/', VideoUploadView.as_view(), name='video-upload'),
 ]
\ No newline at end of file
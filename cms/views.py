@@ -2,18 +2,27 @@
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from .models import HeroSection, Component, Package, HomePage
+from django.utils.decorators import method_decorator
+from .cache import CachedConditionalMixin, cache_response, conditional_queryset
+from .catalogue import catalogue_validators, get_catalogue
+from .uploads import attach_video, discard_part, get_setting as get_upload_setting, write_chunk
+from tawheedUmrahBack.conditional import conditional_get
+from .models import HeroSection, Component, Package, HomePage, VideoUpload
 from .serializers import (
     HeroSectionSerializer, ComponentSerializer, PackageSerializer, 
-    PackageUpdateSerializer, HomePageSerializer, HomePageUpdateSerializer
+    PackageUpdateSerializer, HomePageSerializer, HomePageUpdateSerializer,
+    VideoUploadSerializer
 )
 # Import your custom permissions
 from authentication.permissions import IsAdminOrSuperAdmin
 
-class HeroSectionListView(generics.ListAPIView):
+@method_decorator(cache_response('hero'), name='list')
+class HeroSectionListView(CachedConditionalMixin, generics.ListAPIView):
     serializer_class = HeroSectionSerializer
     permission_classes = [permissions.AllowAny]
+    cache_group = 'hero'
 
     def get_queryset(self):
         return HeroSection.objects.filter(is_active=True)
@@ -23,9 +32,11 @@ class HeroSectionUpdateView(generics.RetrieveUpdateAPIView):
     serializer_class = HeroSectionSerializer
     permission_classes = [IsAdminOrSuperAdmin]  # Changed from permissions.IsAdminUser
 
-class ComponentListView(generics.ListAPIView):
+@method_decorator(cache_response('components'), name='list')
+class ComponentListView(CachedConditionalMixin, generics.ListAPIView):
     serializer_class = ComponentSerializer
     permission_classes = [permissions.AllowAny]
+    cache_group = 'components'
 
     def get_queryset(self):
         component_type = self.request.query_params.get('type', None)
@@ -40,9 +51,11 @@ class ComponentUpdateView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAdminOrSuperAdmin]  # Changed from permissions.IsAdminUser
 
 # Package Views
-class PackageListView(generics.ListAPIView):
+@method_decorator(cache_response('packages'), name='list')
+class PackageListView(CachedConditionalMixin, generics.ListAPIView):
     serializer_class = PackageSerializer
     permission_classes = [permissions.AllowAny]
+    cache_group = 'packages'
 
     def get_queryset(self):
         package_type = self.request.query_params.get('type', None)
@@ -51,10 +64,11 @@ class PackageListView(generics.ListAPIView):
             queryset = queryset.filter(package_type=package_type)
         return queryset
 
-class PackageDetailView(generics.RetrieveAPIView):
+class PackageDetailView(CachedConditionalMixin, generics.RetrieveAPIView):
     serializer_class = PackageSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'package_type'
+    cache_group = 'packages'
 
     def get_queryset(self):
         return Package.objects.filter(is_active=True)
@@ -73,27 +87,10 @@ class PackageCreateView(generics.CreateAPIView):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@conditional_get(catalogue_validators)
 def get_packages_by_category(request):
     """Get packages grouped  by  category"""
-    umrah_packages = Package.objects.filter(
-        package_type__startswith='umrah_', is_active=True
-    ).order_by('package_type')
-    
-    hajj_packages = Package.objects.filter(
-        package_type__startswith='hajj_', is_active=True
-    ).order_by('package_type')
-    
-    ramadan_packages = Package.objects.filter(
-        package_type__startswith='ramadan_', is_active=True
-    ).order_by('package_type')
-    
-    data = {
-        'umrah_packages': PackageSerializer(umrah_packages, many=True).data,
-        'hajj_packages': PackageSerializer(hajj_packages, many=True).data,
-        'ramadan_packages': PackageSerializer(ramadan_packages, many=True).data,
-    }
-    
-    return Response(data)
+    return Response(get_catalogue()['categories'])
 
 @api_view(['PATCH'])
 @permission_classes([IsAdminOrSuperAdmin])  # Changed from permissions.IsAdminUser
@@ -132,9 +129,10 @@ def create_package(request):
 
 # Homepage Views
 # Homepage Views - FIXED
-class HomePageView(generics.ListAPIView):
+class HomePageView(CachedConditionalMixin, generics.ListAPIView):
     serializer_class = HomePageSerializer
     permission_classes = [permissions.AllowAny]
+    cache_group = 'homepage'
 
     def get_queryset(self):
         return HomePage.objects.filter(is_active=True)
@@ -169,6 +167,8 @@ class HomePageCreateView(generics.CreateAPIView):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@conditional_queryset('homepage', lambda: HomePage.objects.filter(is_active=True))
+@cache_response('homepage')
 def get_active_homepage(request):
     """Get the active homepage content"""
     try:
@@ -204,18 +204,96 @@ def create_homepage(request):
     
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@conditional_get(catalogue_validators)
 def get_all_packages(request):
     """Get all active packages - public access"""
     try:
-        packages = Package.objects.filter(is_active=True).order_by('id')
-        serializer = PackageSerializer(packages, many=True)
+        packages = get_catalogue()['packages']
         return Response({
             'success': True,
-            'count': packages.count(),
-            'packages': serializer.data
+            'count': len(packages),
+            'packages': packages
         })
     except Exception as e:
         return Response({
             'success': False,
             'error': str(e)
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)    
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)    
+
+
+# Resumable video uploads
+class VideoUploadCreateView(generics.CreateAPIView):
+    """Start an upload: {target, object_id, filename, size}"""
+    serializer_class = VideoUploadSerializer
+    permission_classes = [IsAdminOrSuperAdmin]
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+
+class VideoUploadView(generics.GenericAPIView):
+    """
+    GET returns the upload's current offset so an interrupted client can resume.
+    PATCH appends the raw request body at the ``Upload-Offset`` header; the
+    body is streamed to disk and never parsed into memory.
+    """
+    queryset = VideoUpload.objects.all()
+    serializer_class = VideoUploadSerializer
+    permission_classes = [IsAdminOrSuperAdmin]
+    parser_classes = []
+
+    def get(self, request, *args, **kwargs):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    def patch(self, request, *args, **kwargs):
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Upload-Offset and Content-Length headers are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 < length <= get_upload_setting('CHUNK_SIZE'):
+            return Response(
+                {'error': f"Chunks must be between 1 and {get_upload_setting('CHUNK_SIZE')} bytes"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            upload = get_object_or_404(VideoUpload.objects.select_for_update(), pk=kwargs['pk'])
+            if upload.status == 'complete' or offset != upload.offset:
+                return Response({
+                    'error': 'Upload-Offset does not match the upload',
+                    'offset': upload.offset,
+                    'status': upload.status
+                }, status=status.HTTP_409_CONFLICT)
+            if offset + length > upload.size:
+                return Response(
+                    {'error': 'Chunk runs past the declared size', 'offset': upload.offset},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            written = write_chunk(upload, request.stream, length)
+            if written < length:
+                return Response({
+                    'error': 'Chunk was cut short, resend it from the same offset',
+                    'offset': upload.offset
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            upload.offset += written
+            data = {}
+            if upload.offset == upload.size:
+                instance = attach_video(upload)
+                upload.status = 'complete'
+                data['background_video'] = request.build_absolute_uri(instance.background_video.url)
+            upload.save(update_fields=['offset', 'status', 'updated_at'])
+
+        return Response({**self.get_serializer(upload).data, **data})
+
+    def delete(self, request, *args, **kwargs):
+        upload = self.get_object()
+        discard_part(upload)
+        upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
@@ -13,6 +13,10 @@ class ContactUs(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='contact_created_id_idx'),
+        ]
         verbose_name = 'Contact Us'
         verbose_name_plural = 'Contact Us'
 
@@ -1,3 +1,46 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from tawheedUmrahBack.throttling import get_buckets
+from .models import ContactUs
 
-# Create your tests here.
+
+class ContactIdempotencyTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        get_buckets().clear()
+        self.client = APIClient()
+        self.payload = {
+            'name': 'Visitor', 'email': 'visitor@example.com',
+            'phone': '9999999999', 'message': 'Please call me back'
+        }
+
+    def submit(self, payload, key='contact-1'):
+        return self.client.post(reverse('contact-us'), payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_creates_one_row(self):
+        self.assertEqual(self.submit(self.payload).status_code, 201)
+
+        with self.assertNumQueries(0):
+            retry = self.submit(self.payload)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(ContactUs.objects.count(), 1)
+
+    def test_key_reused_with_different_body_is_rejected(self):
+        self.submit(self.payload)
+
+        response = self.submit({**self.payload, 'message': 'Something else'})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(ContactUs.objects.count(), 1)
+
+    def test_failed_request_does_not_burn_the_key(self):
+        self.assertEqual(self.submit({**self.payload, 'email': 'not-an-email'}).status_code, 400)
+
+        self.assertEqual(self.submit(self.payload).status_code, 201)
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        self.client.post(reverse('contact-us'), self.payload, format='json')
+        self.client.post(reverse('contact-us'), self.payload, format='json')
+        self.assertEqual(ContactUs.objects.count(), 2)
@@ -2,11 +2,14 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from .models import ContactUs
 from authentication.permissions import IsConsultingOrAbove
+from tawheedUmrahBack.idempotency import IdempotentCreateMixin
+from tawheedUmrahBack.pagination import KeysetPagination
 from .serializers import ContactUsSerializer
 
-class ContactUsCreateView(generics.CreateAPIView):
+class ContactUsCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = ContactUsSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'contact'
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -20,4 +23,5 @@ class ContactUsListView(generics.ListAPIView):
     queryset = ContactUs.objects.all()
     serializer_class = ContactUsSerializer
     permission_classes = [IsConsultingOrAbove]
+    pagination_class = KeysetPagination
 
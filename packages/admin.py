@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Package
+from .models import Package, SeatInventory
 
 @admin.register(Package)
 class PackageAdmin(admin.ModelAdmin):
@@ -31,3 +31,12 @@ class PackageAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+
+
+@admin.register(SeatInventory)
+class SeatInventoryAdmin(admin.ModelAdmin):
+    list_display = ('package', 'departure_date', 'capacity', 'reserved', 'updated_at')
+    list_filter = ('departure_date',)
+    search_fields = ('package__name',)
+    list_select_related = ('package',)
+    readonly_fields = ('reserved', 'updated_at')
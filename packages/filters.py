@@ -0,0 +1,19 @@
+from rest_framework.filters import SearchFilter
+from .search import get_search_backend
+
+
+class PackageSearchFilter(SearchFilter):
+    """
+    ?search= backed by the database's full-text engine (see search.py).
+    Results are ranked by relevance unless the client passes ?ordering=.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return queryset
+
+        queryset = get_search_backend().search(queryset, terms)
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by('-search_rank', '-created_at')
+        return queryset
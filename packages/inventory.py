@@ -0,0 +1,91 @@
+"""
+Seat reservations against Package.max_passengers.
+
+Seats are taken with a single conditional UPDATE on the inventory row of
+(package, departure_date), so concurrent bookings only contend on that row
+and can never push ``reserved`` past ``capacity``. A row is created on the
+first reservation of a departure, seeded with the seats of bookings that
+already exist for it.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from .models import SeatInventory
+
+
+class CapacityExceeded(Exception):
+    pass
+
+
+def booked_seats(package, departure_date, exclude=None):
+    """Passengers on the active bookings of a package departure"""
+    bookings = package.bookings.filter(departure_date=departure_date).exclude(status='cancelled')
+    if exclude is not None:
+        bookings = bookings.exclude(pk=exclude)
+    return bookings.aggregate(seats=Coalesce(Sum('passengers'), 0))['seats']
+
+
+def seats_available(package, departure_date, seats, exclude=None):
+    """Whether seats more would fit right now (a check only; reserve_seats decides)"""
+    inventory = SeatInventory.objects.filter(package_id=package.pk, departure_date=departure_date).first()
+    if inventory is not None:
+        return inventory.reserved + seats <= inventory.capacity
+    return booked_seats(package, departure_date, exclude) + seats <= package.max_passengers
+
+
+def reserve_seats(package, departure_date, seats, exclude=None):
+    """
+    Reserve seats on a package departure or raise CapacityExceeded.
+
+    exclude is the pk of the booking being reserved for, so its own row isn't
+    counted when the inventory row is seeded.
+    """
+    if seats <= 0:
+        return
+
+    inventory = SeatInventory.objects.filter(package_id=package.pk, departure_date=departure_date)
+    for _ in range(2):
+        updated = inventory.filter(reserved__lte=F('capacity') - seats).update(
+            reserved=F('reserved') + seats, updated_at=timezone.now()
+        )
+        if updated:
+            return
+        if inventory.exists():
+            raise CapacityExceeded
+        try:
+            # First reservation for this departure; a concurrent creator may win the race
+            with transaction.atomic():
+                SeatInventory.objects.create(
+                    package_id=package.pk, departure_date=departure_date,
+                    capacity=package.max_passengers,
+                    reserved=booked_seats(package, departure_date, exclude)
+                )
+        except IntegrityError:
+            pass
+    raise CapacityExceeded
+
+
+def release_seats(package_id, departure_date, seats):
+    """Give seats back, never below zero (bookings made before inventory was tracked)"""
+    if not package_id or seats <= 0:
+        return
+    SeatInventory.objects.filter(package_id=package_id, departure_date=departure_date).update(
+        reserved=Greatest(F('reserved') - seats, 0), updated_at=timezone.now()
+    )
+
+
+def sync_inventory(package):
+    """Recount reserved seats of every departure of package from its bookings"""
+    departures = set(
+        package.bookings.exclude(status='cancelled').values_list('departure_date', flat=True)
+    )
+    departures.update(package.seat_inventory.values_list('departure_date', flat=True))
+    for departure_date in departures:
+        reserved = booked_seats(package, departure_date)
+        SeatInventory.objects.update_or_create(
+            package_id=package.pk, departure_date=departure_date,
+            defaults={'reserved': reserved},
+            create_defaults={'capacity': package.max_passengers, 'reserved': reserved},
+        )
+    return len(departures)
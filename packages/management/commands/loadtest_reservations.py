@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, transaction
+from packages.inventory import CapacityExceeded, reserve_seats
+from packages.models import Package, SeatInventory
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer one package departure with concurrent seat reservations and check '
+        'that it never oversells. Run against a file or server database; the '
+        'package and its inventory are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--capacity', type=int, default=100)
+        parser.add_argument('--attempts', type=int, default=1000)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--seats', type=int, default=1, help='Seats per reservation')
+
+    def handle(self, *args, **options):
+        package = Package.objects.create(
+            name='Reservation load test', package_type='umrah', description='Load test',
+            price=0, duration_days=1, max_passengers=options['capacity'],
+            image='package_images/loadtest.jpg', includes='-'
+        )
+        try:
+            self.run(package, options)
+        finally:
+            package.delete()
+
+    def run(self, package, options):
+        def attempt(_):
+            try:
+                with transaction.atomic():
+                    reserve_seats(package, None, options['seats'])
+                return 'reserved'
+            except CapacityExceeded:
+                return 'rejected'
+            except Exception as exc:
+                # SQLite reports writer contention as "database is locked"
+                return type(exc).__name__
+            finally:
+                close_old_connections()
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['threads']) as executor:
+            outcomes = list(executor.map(attempt, range(options['attempts'])))
+        elapsed = time.perf_counter() - started
+
+        reserved = SeatInventory.objects.get(package=package, departure_date=None).reserved
+        successes = outcomes.count('reserved')
+        self.stdout.write(
+            f'{options["attempts"]} attempts on {options["threads"]} threads in {elapsed:.2f}s '
+            f'({options["attempts"] / elapsed:.0f}/s)'
+        )
+        for outcome in sorted(set(outcomes)):
+            self.stdout.write(f'  {outcome}: {outcomes.count(outcome)}')
+        self.stdout.write(f'  seats reserved: {reserved} of {options["capacity"]}')
+
+        if reserved > options['capacity']:
+            raise CommandError(f'Oversold: {reserved} seats reserved of {options["capacity"]}')
+        if reserved != successes * options['seats']:
+            raise CommandError(
+                f'Lost reservations: {reserved} seats reserved for {successes} successful attempts'
+            )
+        self.stdout.write(self.style.SUCCESS('No overselling'))
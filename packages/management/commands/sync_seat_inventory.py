@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from packages.inventory import sync_inventory
+from packages.models import Package
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount reserved seats on every package departure from its active '
+        'bookings, creating missing inventory rows. Run once after deploying '
+        'seat inventory, while no bookings are being made.'
+    )
+
+    def handle(self, *args, **options):
+        departures = 0
+        packages = Package.objects.all()
+        for package in packages.iterator():
+            departures += sync_inventory(package)
+        self.stdout.write(self.style.SUCCESS(
+            f'Synced {departures} departures across {packages.count()} packages'
+        ))
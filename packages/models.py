@@ -16,6 +16,8 @@ class Package(models.Model):
     duration_days = models.IntegerField()
     max_passengers = models.IntegerField()
     image = models.ImageField(upload_to='package_images/')
+    # Responsive WebP copies, filled in by tawheedUmrahBack.derivatives
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_featured = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     
@@ -29,10 +31,50 @@ class Package(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Booking auto-match picks the newest package of a type
+            models.Index(fields=['package_type', '-created_at'], name='package_type_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.get_package_type_display()}"
 
+    @classmethod
+    def canonical_type(cls, value):
+        """Return the package_type code for a code or label such as 'Umrah' or 'Ramadan Special'"""
+        text = ' '.join((value or '').split()).lower()
+        for code, label in cls.PACKAGE_TYPES:
+            if text in (code, label.lower()):
+                return code
+        return None
+
     @property
     def effective_price(self):
         return self.discounted_price if self.discounted_price else self.price
+
+class SeatInventory(models.Model):
+    """Seats reserved on a package for one departure date (null = open date)"""
+    package = models.ForeignKey(Package, on_delete=models.CASCADE, related_name='seat_inventory')
+    departure_date = models.DateField(null=True, blank=True)
+    capacity = models.IntegerField()
+    reserved = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Seat Inventory'
+        constraints = [
+            models.UniqueConstraint(fields=['package', 'departure_date'], name='unique_package_departure'),
+            # NULLs are distinct in unique indexes, so the open date needs its own constraint
+            models.UniqueConstraint(
+                fields=['package'], condition=models.Q(departure_date__isnull=True),
+                name='unique_package_open_departure'
+            ),
+            models.CheckConstraint(condition=models.Q(reserved__gte=0), name='seat_inventory_reserved_gte_0'),
+        ]
+
+    def __str__(self):
+        return f"{self.package.name} ({self.departure_date or 'open date'}): {self.reserved}/{self.capacity}"
+
+    @property
+    def remaining(self):
+        return self.capacity - self.reserved
@@ -0,0 +1,45 @@
+"""
+Resolve the free-text package_type of a booking to a Package.
+
+Resolved packages (and misses) are memoized per canonical type in a small
+in-process cache, so booking creation doesn't query the package table.
+Entries are keyed on a version held in the shared cache, which is bumped
+after every committed package save or delete, so every worker stops using
+its old entries (and old prices) at once.
+"""
+import copy
+import time
+from django.conf import settings
+from django.core.cache import cache
+from tawheedUmrahBack.caching import LRUCache
+from .models import Package
+
+MISSING = object()
+VERSION_KEY = 'packages:resolver:version'
+
+resolver_cache = LRUCache(max_size=64, ttl=getattr(settings, 'PACKAGE_RESOLVER_TTL', 300))
+
+
+def get_version():
+    return cache.get_or_set(VERSION_KEY, time.time_ns(), None)
+
+
+def resolve_package(package_type):
+    """Return the newest Package matching a package type string, or None"""
+    code = Package.canonical_type(package_type)
+    if code is None:
+        return None
+
+    key = (get_version(), code)
+    package = resolver_cache.get(key, MISSING)
+    if package is MISSING:
+        package = Package.objects.filter(package_type=code).first()
+        resolver_cache.set(key, package)
+    # Callers get their own instance; the cached one is shared between requests
+    return copy.copy(package) if package else None
+
+
+def clear_resolver_cache():
+    """Invalidate resolved packages in every worker sharing the cache"""
+    resolver_cache.clear()
+    cache.set(VERSION_KEY, time.time_ns(), None)
@@ -0,0 +1,129 @@
+"""
+Full-text search backends for packages.
+
+The backend is picked from the database vendor, or from the dotted path in
+``settings.PACKAGE_SEARCH_BACKEND``:
+
+* SQLite: an FTS5 table keyed by package id, kept in sync on save/delete
+  and ranked with bm25().
+* PostgreSQL: GIN indexes over the name/description tsvector and a pg_trgm
+  index on name, ranked with ts_rank() and trigram similarity.
+* Anything else: the previous ``icontains`` search, unranked.
+
+Every backend annotates matches with ``search_rank`` (higher is better).
+"""
+import re
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from .models import Package
+
+
+class BasicSearchBackend:
+    """icontains fallback for databases without a full-text engine"""
+
+    def setup(self):
+        pass
+
+    def index(self, package):
+        pass
+
+    def remove(self, package_id):
+        pass
+
+    def search(self, queryset, terms):
+        query = Q()
+        for term in terms.split():
+            query &= Q(name__icontains=term) | Q(description__icontains=term)
+        return queryset.filter(query).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteSearchBackend(BasicSearchBackend):
+    table = f'{Package._meta.db_table}_fts'
+
+    def setup(self):
+        """Create the FTS5 table and rebuild it from the package table"""
+        db_table = Package._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+                f"USING fts5(name, description, tokenize='porter unicode61')"
+            )
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, description) '
+                f'SELECT id, name, description FROM {db_table}'
+            )
+
+    def index(self, package):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [package.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, description) VALUES (%s, %s, %s)',
+                [package.pk, package.name, package.description]
+            )
+
+    def remove(self, package_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [package_id])
+
+    def match_expression(self, terms):
+        # Quote every word so user input can't inject FTS5 syntax; each word is a prefix match
+        words = re.findall(r'\w+', terms)
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def search(self, queryset, terms):
+        match = self.match_expression(terms)
+        if not match:
+            return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+        db_table = Package._meta.db_table
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [match])
+        ).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({self.table}) FROM {self.table} '
+            f'WHERE {self.table} MATCH %s AND rowid = {db_table}.id',
+            [match], output_field=FloatField()
+        ))
+
+
+class PostgresSearchBackend(BasicSearchBackend):
+    # Must match the indexed expression exactly for the GIN index to be used
+    vector = "to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+    def setup(self):
+        db_table = Package._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {db_table}_search_idx '
+                f'ON {db_table} USING GIN (({self.vector}))'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {db_table}_name_trgm_idx '
+                f'ON {db_table} USING GIN (name gin_trgm_ops)'
+            )
+
+    def search(self, queryset, terms):
+        # Expression indexes are maintained by PostgreSQL itself, so index()/remove() are no-ops
+        return queryset.filter(RawSQL(
+            f"{self.vector} @@ plainto_tsquery('english', %s) OR name %% %s",
+            [terms, terms], output_field=BooleanField()
+        )).annotate(search_rank=RawSQL(
+            f"greatest(ts_rank({self.vector}, plainto_tsquery('english', %s)), similarity(name, %s))",
+            [terms, terms], output_field=FloatField()
+        ))
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend():
+    path = getattr(settings, 'PACKAGE_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return BACKENDS.get(connection.vendor, BasicSearchBackend)()
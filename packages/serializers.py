@@ -1,22 +1,32 @@
 from rest_framework import serializers
+from tawheedUmrahBack.derivatives import SrcsetField
 from .models import Package
 
 class PackageSerializer(serializers.ModelSerializer):
     effective_price = serializers.ReadOnlyField()
     package_type_display = serializers.CharField(source='get_package_type_display', read_only=True)
+    image_srcset = SrcsetField(source='image_variants')
 
     class Meta:
         model = Package
-        fields = '__all__'
+        exclude = ['image_variants']
 
 class PackageListSerializer(serializers.ModelSerializer):
     effective_price = serializers.ReadOnlyField()
     package_type_display = serializers.CharField(source='get_package_type_display', read_only=True)
+    image_srcset = SrcsetField(source='image_variants')
 
     class Meta:
         model = Package
         fields = [
             'id', 'name', 'package_type', 'package_type_display', 
             'short_description', 'price', 'discounted_price', 
-            'effective_price', 'duration_days', 'image', 'is_featured'
-        ]
\ No newline at end of file
+            'effective_price', 'duration_days', 'image', 'image_srcset', 'is_featured'
+        ]
+
+class PackageAvailabilitySerializer(PackageListSerializer):
+    """List entry with the open-date seats left (annotated by PackageListView)"""
+    seats_remaining = serializers.IntegerField(read_only=True)
+
+    class Meta(PackageListSerializer.Meta):
+        fields = PackageListSerializer.Meta.fields + ['max_passengers', 'seats_remaining']
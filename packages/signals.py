@@ -0,0 +1,34 @@
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from tawheedUmrahBack.media import watch_image
+from .models import Package, SeatInventory
+from .resolver import clear_resolver_cache
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Package)
+def index_package(sender, instance, created, **kwargs):
+    get_search_backend().index(instance)
+    # After commit, so no worker can re-cache the old row under the new version
+    transaction.on_commit(clear_resolver_cache)
+    if not created:
+        # Capacity follows max_passengers on every departure of the package
+        SeatInventory.objects.filter(package=instance).exclude(
+            capacity=instance.max_passengers
+        ).update(capacity=instance.max_passengers)
+
+
+@receiver(post_delete, sender=Package)
+def unindex_package(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+    transaction.on_commit(clear_resolver_cache)
+
+
+watch_image(Package, 'image', 'image_variants')
+
+
+def setup_search_index(sender, **kwargs):
+    """Create (and on SQLite rebuild) the search index after migrate"""
+    if Package._meta.db_table in connection.introspection.table_names():
+        get_search_backend().setup()
@@ -1,3 +1,95 @@
+from io import StringIO
+from unittest import mock
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .models import Package, SeatInventory
 
-# Create your tests here.
+
+class PackageConditionalGetTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.package = Package.objects.create(
+            name='Classic Hajj', package_type='hajj', description='Hajj package',
+            price=5000, duration_days=21, max_passengers=40,
+            image='package_images/hajj.jpg', includes='Visa, flights'
+        )
+
+    def test_list_and_detail_return_not_modified(self):
+        for url in (reverse('package-list'), reverse('package-detail', args=[self.package.pk])):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Last-Modified', response)
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_deactivating_a_package_changes_the_etag(self):
+        url = reverse('package-list')
+        etag = self.client.get(url)['ETag']
+
+        self.package.is_active = False
+        self.package.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class PackageSearchTest(TestCase):
+
+    def create_package(self, name, description, **kwargs):
+        return Package.objects.create(
+            name=name, package_type='umrah', description=description, price=1000,
+            duration_days=10, max_passengers=40, image='package_images/umrah.jpg',
+            includes='Visa', **kwargs
+        )
+
+    def search(self, terms, **params):
+        response = APIClient().get(reverse('package-list'), {'search': terms, **params})
+        return [row['name'] for row in response.data['results']]
+
+    def test_results_are_ranked_by_relevance(self):
+        self.create_package('Family Umrah', 'Hotels near the haram for families')
+        self.create_package('Ramadan Umrah', 'Spend the last ten nights of Ramadan in Makkah, Ramadan iftar included')
+        self.create_package('Economy Umrah', 'Shared rooms')
+
+        self.assertEqual(self.search('ramadan'), ['Ramadan Umrah'])
+        self.assertEqual(self.search('umrah')[0], 'Economy Umrah')
+        self.assertEqual(self.search('famil'), ['Family Umrah'])
+
+    def test_index_follows_saves_and_deletes(self):
+        package = self.create_package('Classic Umrah', 'Standard hotels')
+        self.assertEqual(self.search('deluxe'), [])
+
+        package.name = 'Deluxe Umrah'
+        package.save()
+        self.assertEqual(self.search('deluxe'), ['Deluxe Umrah'])
+
+        package.delete()
+        self.assertEqual(self.search('deluxe'), [])
+
+    def test_fts_syntax_in_terms_is_ignored(self):
+        self.create_package('Classic Umrah', 'Standard hotels')
+        self.assertEqual(self.search('"classic*  ('), ['Classic Umrah'])
+        self.assertEqual(self.search('"* ('), [])
+
+
+class ReservationLoadTestCommandTest(TestCase):
+
+    def loadtest(self, reserved):
+        with mock.patch('packages.management.commands.loadtest_reservations.reserve_seats'), \
+                mock.patch.object(SeatInventory.objects, 'get', return_value=SeatInventory(reserved=reserved)):
+            call_command('loadtest_reservations', capacity=2, attempts=2, threads=1, stdout=StringIO())
+
+    def test_consistent_run_passes(self):
+        self.loadtest(reserved=2)
+
+    def test_oversell_fails_the_command(self):
+        with self.assertRaisesMessage(CommandError, 'Oversold'):
+            self.loadtest(reserved=3)
+
+    def test_lost_reservations_fail_the_command(self):
+        with self.assertRaisesMessage(CommandError, 'Lost reservations'):
+            self.loadtest(reserved=1)
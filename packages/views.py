@@ -1,22 +1,39 @@
 from rest_framework import generics, permissions
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
-from .models import Package
-from .serializers import PackageSerializer, PackageListSerializer
+from rest_framework.filters import OrderingFilter
+from tawheedUmrahBack.conditional import ConditionalGetMixin
+from .filters import PackageSearchFilter
+from .models import Package, SeatInventory
+from .serializers import PackageSerializer, PackageAvailabilitySerializer
 
-class PackageListView(generics.ListAPIView):
-    serializer_class = PackageListSerializer
+class PackageListView(ConditionalGetMixin, generics.ListAPIView):
+    serializer_class = PackageAvailabilitySerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    # Search runs last so its relevance ordering isn't replaced by the default ordering
+    filter_backends = [DjangoFilterBackend, OrderingFilter, PackageSearchFilter]
     filterset_fields = ['package_type', 'is_featured']
-    search_fields = ['name', 'description']
     ordering_fields = ['price', 'created_at', 'name']
     ordering = ['-created_at']
+    # Reservations change seats_remaining without touching the package row
+    validator_field = 'availability_updated_at'
 
     def get_queryset(self):
-        return Package.objects.filter(is_active=True)
+        # One correlated lookup on the (package, open date) inventory row per package
+        open_date = SeatInventory.objects.filter(package=OuterRef('pk'), departure_date__isnull=True)
+        return Package.objects.filter(is_active=True).annotate(
+            seats_remaining=Coalesce(
+                Subquery(open_date.values(remaining=F('capacity') - F('reserved'))[:1]),
+                F('max_passengers')
+            ),
+            availability_updated_at=Greatest(
+                'updated_at',
+                Coalesce(Subquery(open_date.values('updated_at')[:1]), 'updated_at')
+            ),
+        )
 
-class PackageDetailView(generics.RetrieveAPIView):
+class PackageDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = Package.objects.filter(is_active=True)
     serializer_class = PackageSerializer
     permission_classes = [permissions.AllowAny]
@@ -0,0 +1,10 @@
+import os
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tawheedUmrahBack.settings')
+
+app = Celery('tawheedUmrahBack')
+# All Celery options live in settings.py with a CELERY_ prefix
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+app.autodiscover_tasks(['tawheedUmrahBack'])
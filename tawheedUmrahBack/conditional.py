@@ -0,0 +1,81 @@
+import hashlib
+from functools import wraps
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def compute_validators(request, queryset, updated_field='updated_at'):
+    """
+    ETag and Last-Modified for a queryset, taken from max(updated_at) and
+    its row count so nothing has to be serialized. The absolute URL and query
+    string are folded into the ETag because they change the representation.
+    """
+    stats = queryset.order_by().aggregate(last_modified=Max(updated_field), count=Count('pk'))
+    return make_validators(request, stats['last_modified'], stats['count'])
+
+
+def make_validators(request, last_modified, count):
+    raw = '|'.join([
+        request.build_absolute_uri(request.path),
+        str(sorted(request.GET.lists())),
+        last_modified.isoformat() if last_modified else '',
+        str(count),
+    ])
+    etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+    return etag, int(last_modified.timestamp()) if last_modified else None
+
+
+def respond_conditionally(request, validators, get_response):
+    """Return 304 when the client's validators still match, otherwise the full response"""
+    etag, last_modified = validators
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = get_response()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET for generic list and detail views.
+
+    Validators are computed from the filtered queryset, narrowed to the
+    looked-up object for detail views. Set ``validator_field`` when the
+    representation depends on more than the row's own updated_at.
+    """
+    validator_field = 'updated_at'
+
+    def get_conditional_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_validators(self, request):
+        return compute_validators(request, self.get_conditional_queryset(), self.validator_field)
+
+    def get(self, request, *args, **kwargs):
+        return respond_conditionally(
+            request, self.get_validators(request),
+            lambda: super(ConditionalGetMixin, self).get(request, *args, **kwargs)
+        )
+
+
+def conditional_get(get_validators):
+    """Conditional GET for function views; get_validators(request) -> (etag, last_modified)"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view_func(request, *args, **kwargs)
+            return respond_conditionally(
+                request, get_validators(request),
+                lambda: view_func(request, *args, **kwargs)
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,83 @@
+"""
+Responsive image derivatives.
+
+Each watched image field gets WebP copies at ``IMAGE_DERIVATIVES['WIDTHS']``
+(never upscaled), stored under ``derivatives/`` in the default storage.
+Their names are recorded in a JSON field on the same model as
+``{'source': <original name>, 'widths': {<width>: <name>}}`` and exposed by
+serializers through SrcsetField.
+
+Generation runs in the process_image Celery task (see media.py and
+tasks.py), so requests never wait for Pillow. The result is written back
+with save(), which lets the usual cache invalidation signals run, and is
+skipped when the image changed again in the meantime.
+"""
+import os
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+DEFAULTS = {
+    'WIDTHS': (320, 640, 1024, 1600),
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+}
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg', 'PNG': 'png'}
+
+
+def get_setting(name):
+    return getattr(settings, 'IMAGE_DERIVATIVES', {}).get(name, DEFAULTS[name])
+
+
+def derivative_name(source_name, width):
+    stem = os.path.splitext(source_name)[0]
+    return f"derivatives/{stem}_{width}w.{EXTENSIONS[get_setting('FORMAT')]}"
+
+
+def render_derivatives(file):
+    """Yield (width, encoded bytes) for every configured width below the original's"""
+    with file.open('rb'):
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    widths = [width for width in get_setting('WIDTHS') if width < image.width] or [image.width]
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        buffer = BytesIO()
+        image.resize((width, height), Image.LANCZOS).save(
+            buffer, get_setting('FORMAT'), quality=get_setting('QUALITY')
+        )
+        yield width, buffer.getvalue()
+
+
+def generate_derivatives(source):
+    """Render and store derivatives of a stored image; returns the variants value"""
+    widths = {}
+    for width, content in render_derivatives(source):
+        name = derivative_name(source.name, width)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        widths[str(width)] = default_storage.save(name, ContentFile(content))
+    return {'source': source.name, 'widths': widths}
+
+
+def variant_names(variants):
+    return list((variants or {}).get('widths', {}).values())
+
+
+class SrcsetField(serializers.ReadOnlyField):
+    """{width: url} of an image's derivatives, for building srcset attributes"""
+
+    def to_representation(self, variants):
+        request = self.context.get('request')
+        urls = {}
+        for width, name in (variants or {}).get('widths', {}).items():
+            url = default_storage.url(name)
+            urls[width] = request.build_absolute_uri(url) if request else url
+        return urls
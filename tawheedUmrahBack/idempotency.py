@@ -0,0 +1,104 @@
+"""
+Idempotency-Key support for create endpoints.
+
+A client that retries a POST with the same ``Idempotency-Key`` header gets
+the first response replayed from the cache instead of creating another row.
+Keys are scoped to the view and the requesting user, expire after
+``IDEMPOTENCY['TTL']`` seconds, and cost a single cache lookup per request.
+"""
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+DEFAULTS = {
+    'CACHE': 'default',
+    'TTL': 24 * 60 * 60,
+    'LOCK_TIMEOUT': 60,
+}
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+
+
+def get_setting(name):
+    return getattr(settings, 'IDEMPOTENCY', {}).get(name, DEFAULTS[name])
+
+
+def idempotency_cache():
+    return caches[get_setting('CACHE')]
+
+
+def request_fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IdempotentCreateMixin:
+    """
+    Replay the stored response for a repeated Idempotency-Key.
+
+    While the first request is still running, a retry with the same key gets
+    409; reusing a key with a different body gets 422. Only successful
+    responses are stored, so a request that failed validation can be fixed
+    and sent again under the same key.
+    """
+    idempotency_scope = None
+
+    def get_idempotency_cache_key(self, request, key):
+        scope = self.idempotency_scope or type(self).__name__
+        owner = request.user.pk if request.user.is_authenticated else 'anon'
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return f'idempotency:{scope}:{owner}:{digest}'
+
+    def post(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key:
+            return super().post(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cache = idempotency_cache()
+        cache_key = self.get_idempotency_cache_key(request, key)
+        fingerprint = request_fingerprint(request)
+
+        stored = cache.get(cache_key)
+        if stored is None and cache.add(cache_key, {'fingerprint': fingerprint}, get_setting('LOCK_TIMEOUT')):
+            return self.run_idempotent(cache, cache_key, fingerprint, request, *args, **kwargs)
+        if stored is None:
+            # Another request claimed the key between our get() and add()
+            stored = cache.get(cache_key) or {'fingerprint': fingerprint}
+
+        if stored['fingerprint'] != fingerprint:
+            return Response(
+                {'error': 'Idempotency-Key was already used with a different request'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        if 'status' not in stored:
+            return Response(
+                {'error': 'A request with this Idempotency-Key is still being processed'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(stored['data'], status=stored['status'], headers={'Idempotent-Replayed': 'true'})
+
+    def run_idempotent(self, cache, cache_key, fingerprint, request, *args, **kwargs):
+        try:
+            response = super().post(request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if status.is_success(response.status_code):
+            cache.set(cache_key, {
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'data': response.data,
+            }, get_setting('TTL'))
+        else:
+            cache.delete(cache_key)
+        return response
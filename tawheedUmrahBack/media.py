@@ -0,0 +1,162 @@
+"""
+Registry of media fields processed off the request path.
+
+watch_image() and watch_video() hook a model's file field up to the Celery
+tasks in tasks.py. Saving a new file only stores it; once the transaction
+commits, the image is verified and its derivatives rendered, or the video
+probed, by a worker. The task writes its result to a JSON field on the same
+model, tagged with the file name it describes, so a field whose ``source``
+doesn't match the current file still needs processing.
+
+Replaced and deleted files are removed by the same workers, unless another
+watched field still refers to them.
+
+Without a broker (``CELERY_BROKER_URL`` left at ``memory://``) nothing would
+consume the queue, so tasks are handed to a small thread pool in the web
+process instead; they still run after the response is on its way.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from .derivatives import variant_names
+
+logger = logging.getLogger(__name__)
+
+IMAGE = 'image'
+VIDEO = 'video'
+LOCAL_WORKERS = 2
+
+# model -> [(field, kind, result field)]
+WATCHED = {}
+
+
+def watched_fields():
+    """(model, field) for every watched file field"""
+    for model, fields in WATCHED.items():
+        for field, kind, result_field in fields:
+            yield model, field
+
+
+def file_name(instance, field):
+    value = getattr(instance, field)
+    return value.name if value else None
+
+
+def referenced_names(names):
+    """The subset of names still stored by a watched field"""
+    found = set()
+    for model, field in watched_fields():
+        found.update(model._default_manager.filter(**{f'{field}__in': names}).values_list(field, flat=True))
+    return found
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_local_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(LOCAL_WORKERS, thread_name_prefix='media-tasks')
+    return _executor
+
+
+def run_locally(task, args):
+    try:
+        task.apply(args=args, throw=True)
+    except Exception:
+        logger.exception('Media task %s%r failed', task.name, args)
+    finally:
+        close_old_connections()
+
+
+def enqueue(task, *args):
+    """Queue task on the broker, or on the local thread pool when there is none"""
+    if settings.CELERY_TASK_ALWAYS_EAGER:
+        task.apply(args=args)
+    elif settings.CELERY_BROKER_URL.startswith('memory://'):
+        get_local_executor().submit(run_locally, task, args)
+    else:
+        task.apply_async(args=args)
+
+
+def loaded_fields(sender, instance):
+    """Watched fields whose file and result are both loaded on instance"""
+    for field, kind, result_field in WATCHED[sender]:
+        if field in instance.__dict__ and result_field in instance.__dict__:
+            yield field, kind, result_field
+
+
+def remember_files(sender, instance, **kwargs):
+    # Read straight from __dict__ so deferred fields stay deferred
+    instance._media_files = {
+        field: str(instance.__dict__[field] or '')
+        for field, kind, result_field in loaded_fields(sender, instance)
+    }
+
+
+def process_saved_files(sender, instance, created, **kwargs):
+    from . import tasks
+
+    label = instance._meta.label
+    previous = {} if created else getattr(instance, '_media_files', {})
+    replaced = []
+    for field, kind, result_field in loaded_fields(sender, instance):
+        name = file_name(instance, field)
+        if previous.get(field) and previous[field] != name:
+            replaced.append(previous[field])
+
+        result = getattr(instance, result_field) or {}
+        if result.get('source') != name:
+            task = tasks.process_image if kind == IMAGE else tasks.probe_video
+            args = (label, instance.pk, field, result_field)
+            transaction.on_commit(lambda task=task, args=args: enqueue(task, *args))
+
+    if replaced:
+        transaction.on_commit(lambda: enqueue(tasks.delete_unreferenced_files, replaced))
+    remember_files(sender, instance)
+
+
+def delete_files(sender, instance, **kwargs):
+    from . import tasks
+
+    names = []
+    for field, kind, result_field in loaded_fields(sender, instance):
+        name = file_name(instance, field)
+        if name:
+            names.append(name)
+        if kind == IMAGE:
+            names.extend(variant_names(getattr(instance, result_field)))
+    if names:
+        transaction.on_commit(lambda: enqueue(tasks.delete_unreferenced_files, names))
+
+
+def watch(model, field, kind, result_field):
+    if model not in WATCHED:
+        WATCHED[model] = []
+        uid = f'media:{model._meta.label}'
+        post_init.connect(remember_files, sender=model, dispatch_uid=uid)
+        post_save.connect(process_saved_files, sender=model, dispatch_uid=uid)
+        post_delete.connect(delete_files, sender=model, dispatch_uid=uid)
+    if (field, kind, result_field) not in WATCHED[model]:
+        WATCHED[model].append((field, kind, result_field))
+
+
+def watch_image(model, field, variants_field):
+    """Verify model.<field> and render its derivatives into variants_field"""
+    watch(model, field, IMAGE, variants_field)
+
+
+def watch_video(model, field, info_field):
+    """Probe model.<field> and store its format, duration and size in info_field"""
+    watch(model, field, VIDEO, info_field)
+
+
+def get_instance(model_label, pk):
+    return apps.get_model(model_label)._default_manager.filter(pk=pk).first()
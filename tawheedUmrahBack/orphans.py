@@ -0,0 +1,141 @@
+"""
+Garbage collection of orphaned media files.
+
+MEDIA_ROOT is walked with os.scandir one directory at a time, and every file
+is checked against the names stored in the project's file fields plus the
+derivatives recorded by watched image fields. Unreferenced files older than
+``MEDIA_GC['MIN_AGE']`` are deleted, or moved to a quarantine directory, in
+batches of ``MEDIA_GC['BATCH_SIZE']``. The quarantine directory and the
+resumable upload part directory are never walked; part files have their own
+expiry (``cms.uploads.discard_stale_parts``). Each batch is checked against the
+database again first, so a file attached while the walk was running is kept.
+"""
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+from cms.uploads import part_dir
+from .derivatives import variant_names
+from .media import IMAGE, WATCHED
+
+DEFAULTS = {
+    'MIN_AGE': 24 * 60 * 60,
+    'BATCH_SIZE': 500,
+    'QUARANTINE_DIR': None,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'MEDIA_GC', {}).get(name, DEFAULTS[name])
+
+
+@dataclass
+class CollectionResult:
+    scanned: int = 0
+    orphaned: int = 0
+    reclaimed: int = 0  # bytes
+
+
+def file_fields():
+    """(model, field name) for every file field of every installed model"""
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                yield model, field.attname
+
+
+def referenced_files():
+    """Every media name currently stored in the database"""
+    names = set()
+    for model, field in file_fields():
+        names.update(model._default_manager.exclude(**{field: ''}).values_list(field, flat=True).iterator())
+    for model, watched in WATCHED.items():
+        for field, kind, result_field in watched:
+            if kind == IMAGE:
+                for variants in model._default_manager.values_list(result_field, flat=True).iterator():
+                    names.update(variant_names(variants))
+    names.discard(None)
+    return names
+
+
+def referenced_among(names):
+    """The subset of names stored in a file field right now"""
+    found = set()
+    for model, field in file_fields():
+        found.update(model._default_manager.filter(**{f'{field}__in': names}).values_list(field, flat=True))
+    return found
+
+
+def walk(directory, skip=()):
+    """Yield a DirEntry for every regular file below directory, depth first, except under skip"""
+    try:
+        entries = os.scandir(directory)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if Path(entry.path) not in skip:
+                    yield from walk(entry.path, skip)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def find_orphans(root, referenced, min_age, skip=(), result=None):
+    """Yield (name, path, size) of unreferenced files last modified over min_age seconds ago"""
+    cutoff = time.time() - min_age
+    for entry in walk(root, skip):
+        if result is not None:
+            result.scanned += 1
+        name = Path(entry.path).relative_to(root).as_posix()
+        if name in referenced:
+            continue
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime <= cutoff:
+            yield name, entry.path, stat.st_size
+
+
+def quarantine(path, name, quarantine_dir):
+    target = Path(quarantine_dir) / name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(path, target)
+
+
+def collect_orphans(dry_run=False, quarantine_dir=None, min_age=None, batch_size=None):
+    """
+    Delete (or quarantine) orphaned files under MEDIA_ROOT.
+
+    With dry_run nothing is touched and the result reports what would have
+    been reclaimed.
+    """
+    root = Path(settings.MEDIA_ROOT).resolve()
+    quarantine_dir = quarantine_dir or get_setting('QUARANTINE_DIR')
+    min_age = get_setting('MIN_AGE') if min_age is None else min_age
+    batch_size = batch_size or get_setting('BATCH_SIZE')
+    skip = {part_dir().resolve()}
+    if quarantine_dir:
+        skip.add(Path(quarantine_dir).resolve())
+
+    result = CollectionResult()
+    orphans = find_orphans(root, referenced_files(), min_age, skip, result)
+    while batch := list(islice(orphans, batch_size)):
+        attached = referenced_among([name for name, path, size in batch])
+        for name, path, size in batch:
+            if name in attached:
+                continue
+            if not dry_run:
+                try:
+                    if quarantine_dir:
+                        quarantine(path, name, quarantine_dir)
+                    else:
+                        os.remove(path)
+                except FileNotFoundError:
+                    continue
+            result.orphaned += 1
+            result.reclaimed += size
+    return result
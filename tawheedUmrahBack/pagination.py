@@ -0,0 +1,88 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset (cursor) mode.
+
+    Clients opt in with ``?pagination=cursor`` and then follow the ``next``
+    link. Cursor pages seek on ``(<ordering field>, id)`` newest first, so
+    deep pages cost the same as the first one and no COUNT(*) is run.
+    Views choose the timestamp column with ``cursor_ordering_field``.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    ordering_field = 'created_at'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.field = getattr(view, 'cursor_ordering_field', self.ordering_field)
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(f'-{self.field}', '-id')
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            value, pk = self.decode_cursor(encoded, queryset.model)
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__lt': value}) | Q(**{self.field: value, 'id__lt': pk})
+            )
+
+        # Fetch one extra row to know whether there is a next page
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        self.page = results[:page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.mode_query_param, 'cursor')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(last))
+
+    def get_previous_link(self):
+        if not self.use_cursor:
+            return super().get_previous_link()
+        return None
+
+    def encode_cursor(self, obj):
+        value = getattr(obj, self.field)
+        payload = json.dumps([value.isoformat(), obj.pk])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, encoded, model):
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            value = model._meta.get_field(self.field).to_python(value)
+            pk = int(pk)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
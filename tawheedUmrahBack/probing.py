@@ -0,0 +1,117 @@
+"""
+Lightweight video container probing.
+
+Only the container headers are read: for MP4/QuickTime the top-level boxes
+are walked (seeking over the media data) until the movie header gives the
+duration; WebM and Ogg are recognised from their signatures. Nothing is
+decoded, so probing a large file costs a handful of small reads.
+"""
+import struct
+
+EBML_MAGIC = b'\x1a\x45\xdf\xa3'
+OGG_MAGIC = b'OggS'
+ISO_BRANDS = {b'qt  ': 'mov'}
+
+
+class MalformedBox(ValueError):
+    pass
+
+
+def read_box_header(file):
+    """
+    Return (type, payload size) of the box at the current position, or None
+    at EOF. The size is None for a box that extends to the end of the file.
+    """
+    header = file.read(8)
+    if len(header) < 8:
+        return None
+    size, box_type = struct.unpack('>I4s', header)
+    if size == 1:
+        size = struct.unpack('>Q', file.read(8))[0]
+        if size < 16:
+            raise MalformedBox(f'{box_type!r} box with a 64-bit size of {size}')
+        return box_type, size - 16
+    if size == 0:
+        return box_type, None
+    if size < 8:
+        raise MalformedBox(f'{box_type!r} box with a size of {size}')
+    return box_type, size - 8
+
+
+def read_mvhd(file):
+    version = file.read(4)[0]
+    if version == 1:
+        file.read(16)
+        timescale, duration = struct.unpack('>IQ', file.read(12))
+    else:
+        file.read(8)
+        timescale, duration = struct.unpack('>II', file.read(8))
+    return round(duration / timescale, 3) if timescale else None
+
+
+def find_mvhd(file, end):
+    """Duration from the movie header among the boxes up to end (None: end of file)"""
+    while end is None or file.tell() < end:
+        child = read_box_header(file)
+        if child is None:
+            return None
+        box_type, size = child
+        if box_type == b'mvhd':
+            return read_mvhd(file)
+        if size is None:
+            return None
+        file.seek(size, 1)
+    return None
+
+
+def probe_iso_media(file):
+    """(format, duration in seconds) of an MP4/QuickTime file"""
+    video_format = 'mp4'
+    while True:
+        box = read_box_header(file)
+        if box is None:
+            return video_format, None
+        box_type, size = box
+        if size is None:
+            # Runs to the end of the file, so nothing follows it
+            if box_type == b'ftyp':
+                video_format = ISO_BRANDS.get(file.read(4), 'mp4')
+            elif box_type == b'moov':
+                return video_format, find_mvhd(file, None)
+            return video_format, None
+        if box_type == b'ftyp':
+            if size >= 4:
+                video_format = ISO_BRANDS.get(file.read(4), 'mp4')
+                file.seek(size - 4, 1)
+            else:
+                file.seek(size, 1)
+        elif box_type == b'moov':
+            return video_format, find_mvhd(file, file.tell() + size)
+        else:
+            file.seek(size, 1)
+
+
+def probe_video_file(file):
+    """
+    Describe an open binary video file as {'format', 'duration', 'size'}.
+
+    format is None when the container isn't recognised; duration is None when
+    it isn't known from the headers alone.
+    """
+    file.seek(0, 2)
+    size = file.tell()
+    file.seek(0)
+    head = file.read(12)
+    file.seek(0)
+
+    video_format = duration = None
+    if head[4:8] == b'ftyp':
+        try:
+            video_format, duration = probe_iso_media(file)
+        except (MalformedBox, struct.error, IndexError):
+            video_format = 'mp4'
+    elif head.startswith(EBML_MAGIC):
+        video_format = 'webm'
+    elif head.startswith(OGG_MAGIC):
+        video_format = 'ogg'
+    return {'format': video_format, 'duration': duration, 'size': size}
@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from corsheaders.defaults import default_headers
 from decouple import config
 import dj_database_url
 
@@ -37,6 +38,21 @@ INSTALLED_APPS = [
 
 AUTH_USER_MODEL = 'authentication.CustomUser'
 
+AUTHENTICATION_BACKENDS = [
+    'authentication.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# PBKDF2 hashes run on the bounded pool in authentication/hashing.py. Django's
+# own PBKDF2PasswordHasher is left out: hashers are looked up by algorithm name.
+PASSWORD_HASHERS = [
+    'authentication.hashing.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files serving
@@ -116,11 +132,38 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache Configuration - shared Redis when REDIS_URL is set, per-process memory otherwise
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Public CMS responses are cached until a committed model save/delete
+# invalidates them. Invalidation only reaches other workers through a shared
+# cache, so without REDIS_URL they aren't cached and edits show up at once.
+CMS_CACHE_ENABLED = config('CMS_CACHE_ENABLED', default=bool(REDIS_URL), cast=bool)
+CMS_CACHE_TIMEOUT = 60 * 60
+
+# Seconds a worker may keep a resolved booking package (and its price). Saves
+# invalidate every worker through the shared cache; without one, keep it short.
+PACKAGE_RESOLVER_TTL = 300 if REDIS_URL else 10
+
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'authentication.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -135,6 +178,18 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'tawheedUmrahBack.throttling.TokenBucketThrottle',
+    ],
+    # Reverse proxies in front of the app. Throttling keys on the client address
+    # they append to X-Forwarded-For; with 0 the header is ignored and
+    # REMOTE_ADDR is used, so clients can't pick their own bucket.
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
+    # Token bucket per client IP and view throttle_scope: burst size / refill period
+    'DEFAULT_THROTTLE_RATES': {
+        'contact': config('THROTTLE_CONTACT_RATE', default='5/min'),
+        'register': config('THROTTLE_REGISTER_RATE', default='10/hour'),
+    },
 }
 
 APPEND_SLASH = False
@@ -148,6 +203,7 @@ CORS_ALLOWED_ORIGINS = [
 
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # Logging Configuration
 LOGGING = {
@@ -192,6 +248,92 @@ LOGGING = {
 # Create logs directory if it doesn't exist
 os.makedirs(BASE_DIR / 'logs', exist_ok=True)
 
+# Audit logging: UserActivity rows are buffered in-process and written in batches
+AUDIT_LOG = {
+    'ASYNC': True,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 2.0,  # seconds
+    'MAX_QUEUE_SIZE': 10000,
+}
+
+# Token authentication cache: a per-process LRU in front of a shared cache alias,
+# which also holds the per-user generations that invalidate it. Without a shared
+# cache logouts couldn't reach other workers, so tokens aren't cached at all.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 2048,
+    'TTL': 30,  # seconds
+    'SHARED_CACHE': 'default' if REDIS_URL else None,
+}
+
+# Password hashes run on a bounded pool; requests beyond workers + queue get 503.
+# The limit is counted in the shared cache across processes; without one it is
+# per process and only sheds load on a threaded server.
+PASSWORD_HASHING = {
+    'MAX_WORKERS': config('PASSWORD_HASH_WORKERS', default=os.cpu_count() or 2, cast=int),
+    'MAX_QUEUE': 16,
+    'SHARED_CACHE': 'default' if REDIS_URL else None,
+}
+
+# Bulk user import: insert batch size, and password hashing processes for the
+# import_users command (the endpoint hashes on the PASSWORD_HASHING pool)
+USER_IMPORT = {
+    'PROCESSES': config('USER_IMPORT_PROCESSES', default=os.cpu_count() or 2, cast=int),
+    'BATCH_SIZE': 500,
+    'MAX_ROWS_PER_REQUEST': 500,
+}
+
+# Throttle buckets are per process unless REDIS_URL is given
+THROTTLE = {
+    'REDIS_URL': REDIS_URL or None,
+    'MAX_BUCKETS': 10000,
+}
+
+# Idempotency-Key replay for booking and contact submissions
+IDEMPOTENCY = {
+    'CACHE': 'default',
+    'TTL': 24 * 60 * 60,  # seconds a stored response can be replayed
+    'LOCK_TIMEOUT': 60,  # seconds a key stays claimed by an in-flight request
+}
+
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
\ No newline at end of file
+DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
+
+# Resumable hero/homepage video uploads. Chunks are streamed to part files in
+# TEMP_DIR (FILE_UPLOAD_TEMP_DIR or the system temp dir when None), which must
+# be shared by all app workers, and the finished file is handed to storage.
+VIDEO_UPLOAD = {
+    'TEMP_DIR': None,
+    'MAX_SIZE': 1024 * 1024 * 1024,  # 1GB
+    'CHUNK_SIZE': 8 * 1024 * 1024,  # largest accepted PATCH body
+    'STALE_AFTER': 7 * 24 * 60 * 60,  # seconds before an idle upload is discarded
+}
+
+# Responsive WebP copies of CMS and package images, rendered by a Celery task
+IMAGE_DERIVATIVES = {
+    'WIDTHS': (320, 640, 1024, 1600),
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+}
+
+# collect_orphaned_media: files under MEDIA_ROOT that no model refers to.
+# MIN_AGE protects uploads whose row hasn't been committed yet; with a
+# QUARANTINE_DIR orphans are moved there instead of being deleted.
+MEDIA_GC = {
+    'MIN_AGE': 24 * 60 * 60,
+    'BATCH_SIZE': 500,
+    'QUARANTINE_DIR': None,
+}
+
+# Celery: media processing runs off the request path. Without a broker
+# (memory://) there is no worker, so media tasks run on a small thread pool in
+# the web process instead. Eager mode runs them inline in the committing
+# request; it is meant for tests and debugging only and has to be opted into.
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default=REDIS_URL or 'memory://')
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TIMEZONE = TIME_ZONE
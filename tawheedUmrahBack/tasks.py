@@ -0,0 +1,91 @@
+"""
+Media processing tasks, queued by the watchers in media.py.
+
+Every task reloads the row and re-checks it before writing, since the file
+may have been replaced or the row deleted while the task was queued.
+"""
+import logging
+from celery import shared_task
+from django.core.files.storage import default_storage
+from PIL import Image
+from .derivatives import generate_derivatives, variant_names
+from .media import file_name, get_instance, referenced_names
+from .probing import probe_video_file
+
+logger = logging.getLogger(__name__)
+
+
+def is_valid_image(file):
+    try:
+        with file.open('rb'):
+            Image.open(file).verify()
+    except Exception:
+        return False
+    return True
+
+
+def delete_names(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def record_result(model_label, pk, field, result_field, source, result):
+    """Store result unless field no longer holds source; returns whether it was stored"""
+    instance = get_instance(model_label, pk)
+    if instance is None or file_name(instance, field) != source:
+        return False
+    setattr(instance, result_field, result)
+    instance.save(update_fields=[result_field, 'updated_at'])
+    return True
+
+
+@shared_task
+def process_image(model_label, pk, field, variants_field):
+    """Verify an uploaded image and render its responsive derivatives"""
+    instance = get_instance(model_label, pk)
+    if instance is None:
+        return
+    source = file_name(instance, field)
+    previous = variant_names(getattr(instance, variants_field))
+
+    if source and not is_valid_image(getattr(instance, field)):
+        # Upload checks only sniff the format; a file Pillow can't read is dropped
+        # here, and the watcher deletes it once the cleared field is saved
+        logger.warning('Discarding invalid image %s on %s %s', source, model_label, pk)
+        setattr(instance, field, '')
+        setattr(instance, variants_field, {})
+        instance.save(update_fields=[field, variants_field, 'updated_at'])
+        delete_names(previous)
+        return
+
+    variants = generate_derivatives(getattr(instance, field)) if source else {}
+    current = variant_names(variants)
+    if record_result(model_label, pk, field, variants_field, source, variants):
+        delete_names(name for name in previous if name not in current)
+    else:
+        # Replaced while rendering; the newer image has its own task
+        delete_names(current)
+
+
+@shared_task
+def probe_video(model_label, pk, field, info_field):
+    """Record the container format, duration and size of an uploaded video"""
+    instance = get_instance(model_label, pk)
+    if instance is None:
+        return
+    source = file_name(instance, field)
+    info = {}
+    if source:
+        video = getattr(instance, field)
+        with video.open('rb'):
+            info = {'source': source, **probe_video_file(video)}
+        if info['format'] is None:
+            logger.warning('Unrecognised video container %s on %s %s', source, model_label, pk)
+    record_result(model_label, pk, field, info_field, source, info)
+
+
+@shared_task
+def delete_unreferenced_files(names):
+    """Delete replaced or orphaned files that no watched field refers to any more"""
+    keep = referenced_names(names)
+    delete_names(name for name in names if name not in keep)
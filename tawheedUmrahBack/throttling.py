@@ -0,0 +1,134 @@
+"""
+Token bucket throttling for unauthenticated write endpoints.
+
+Each (scope, client IP) pair owns a bucket that holds up to N tokens and
+refills at N per period, where N/period comes from the DRF rate string in
+``DEFAULT_THROTTLE_RATES`` (e.g. ``'5/min'``). A request spends one token.
+Buckets are two numbers, so a check is O(1) and never touches the database.
+
+Buckets live in process memory by default. Set ``THROTTLE['REDIS_URL']``
+to share them between workers; the refill-and-spend step then runs as one
+Lua script so concurrent workers can't both spend the last token.
+"""
+import threading
+import time
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+from .caching import LRUCache
+
+DEFAULTS = {
+    'REDIS_URL': None,
+    'MAX_BUCKETS': 10000,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'THROTTLE', {}).get(name, DEFAULTS[name])
+
+
+class MemoryBuckets:
+    """Per-process buckets; idle ones are evicted once they would be full again"""
+
+    def __init__(self, max_size):
+        self.buckets = LRUCache(max_size=max_size)
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, period):
+        now = time.monotonic()
+        refill_rate = capacity / period
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets.set(key, (tokens, now), ttl=period)
+        return allowed, 0 if allowed else (1 - tokens) / refill_rate
+
+    def clear(self):
+        self.buckets.clear()
+
+
+class RedisBuckets:
+    """Buckets shared through Redis, one hash per key with a TTL of one period"""
+
+    script = """
+    local capacity = tonumber(ARGV[1])
+    local period = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * capacity / period)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(period))
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.consume_script = self.client.register_script(self.script)
+
+    def consume(self, key, capacity, period):
+        allowed, tokens = self.consume_script(keys=[key], args=[capacity, period, time.time()])
+        if allowed:
+            return True, 0
+        return False, (1 - float(tokens)) * period / capacity
+
+    def clear(self):
+        for key in self.client.scan_iter('throttle:*'):
+            self.client.delete(key)
+
+
+_buckets = None
+_buckets_lock = threading.Lock()
+
+
+def get_buckets():
+    global _buckets
+    if _buckets is None:
+        with _buckets_lock:
+            if _buckets is None:
+                url = get_setting('REDIS_URL')
+                _buckets = RedisBuckets(url) if url else MemoryBuckets(get_setting('MAX_BUCKETS'))
+    return _buckets
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Per-IP token bucket for the view's ``throttle_scope``.
+
+    Views without a rate configured for their scope are not throttled.
+    """
+
+    def __init__(self):
+        self.wait_seconds = 0
+
+    def get_cache_key(self, request, view):
+        return f'throttle:{self.scope}:{self.get_ident(request)}'
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, 'throttle_scope', None)
+        self.rate = self.get_rate() if self.scope else None
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        allowed, self.wait_seconds = get_buckets().consume(
+            self.get_cache_key(request, view), self.num_requests, self.duration
+        )
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds